@@ -0,0 +1,108 @@
+"""Libro de aperturas: árbol de decisión precalculado por estrategia y tamaño.
+
+Cada tamaño se guarda en aperturas/<estrategia>_<n>.npy como una tabla
+uint32 de forma (nodos, n + 2): la columna 0 es el rango de la propuesta del
+nodo y la columna 1 + a el nodo al que se pasa tras responder `a` aciertos
+(0 si esa rama queda fuera del libro). El nodo 0 es la primera propuesta.
+Las tablas se abren con memoria mapeada y se comparten entre partidas.
+
+Uso: python aperturas.py [--estrategia minimax] [--tamanos 3 4 5 6 7 8]
+"""
+import argparse
+import os
+import random
+
+import numpy as np
+
+import universos
+import estrategias
+from estrategias import ESTRATEGIAS
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aperturas")
+PROFUNDIDAD = 5  # Propuestas por rama que se guardan en el libro
+
+_libros = {}
+
+
+def ruta(estrategia, n):
+    return os.path.join(DIRECTORIO, f"{estrategia}_{n}.npy")
+
+
+def cargar(estrategia, n):
+    """Tabla del libro con memoria mapeada, o None si no se ha construido"""
+    clave = (estrategia, n)
+    if clave not in _libros:
+        try:
+            _libros[clave] = np.load(ruta(estrategia, n), mmap_mode="r")
+        except FileNotFoundError:
+            _libros[clave] = None
+    return _libros[clave]
+
+
+def consultar(libro, restricciones):
+    """Rango de la siguiente propuesta según el historial, o None fuera del libro"""
+    nodo = 0
+    for fila, aciertos in restricciones:
+        if not 0 <= aciertos < libro.shape[1] - 1:
+            return None
+        if libro[nodo, 0] != universos.rango(fila):
+            return None
+        nodo = libro[nodo, 1 + aciertos]
+        if nodo == 0:
+            return None
+    return int(libro[nodo, 0])
+
+
+def construir(estrategia, n, profundidad=PROFUNDIDAD):
+    """Recorre todas las respuestas posibles hasta `profundidad` propuestas"""
+    nodos = []
+
+    def expandir(supervivientes, nivel):
+        indice = len(nodos)
+        rango = estrategia.elegir(supervivientes, n)
+        fila = universos.decodificar([rango], n)[0]
+        nodo = [rango] + [0] * (n + 1)
+        nodos.append(nodo)
+        if nivel + 1 < profundidad and len(supervivientes) > 1:
+            # Con n aciertos la partida termina, no hace falta rama
+            for aciertos in range(n):
+                resto = universos.filtrar(supervivientes, n, fila, aciertos)
+                if len(resto):
+                    nodo[1 + aciertos] = expandir(resto, nivel + 1)
+        return indice
+
+    expandir(universos.todos_los_rangos(n), 0)
+    return np.array(nodos, dtype=np.uint32)
+
+
+def guardar(tabla, estrategia, n):
+    os.makedirs(DIRECTORIO, exist_ok=True)
+    temporal = ruta(estrategia, n) + ".tmp"
+    with open(temporal, "wb") as archivo:
+        np.save(archivo, tabla)
+    os.replace(temporal, ruta(estrategia, n))
+    _libros.pop((estrategia, n), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye el libro de aperturas")
+    parser.add_argument("--estrategia", default="minimax",
+                        choices=[nombre for nombre in ESTRATEGIAS if nombre != "aleatoria"])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[3, 4, 5, 6, 7, 8])
+    parser.add_argument("--profundidad", type=int, default=PROFUNDIDAD)
+    args = parser.parse_args()
+
+    estrategias.iniciar_pool()
+    for n in args.tamanos:
+        # Muestreo reproducible y sin límite de tiempo: se calcula una sola vez
+        random.seed(n)
+        np.random.seed(n)
+        estrategia = ESTRATEGIAS[args.estrategia](
+            presupuesto=None, max_propuestas=2000, max_candidatos=20000)
+        tabla = construir(estrategia, n, args.profundidad)
+        guardar(tabla, args.estrategia, n)
+        print(f"n={n}: {len(tabla)} nodos en {ruta(args.estrategia, n)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,195 +1,330 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from logic import *
-import random
-from itertools import permutations, combinations
+from sesiones import GestorSesiones, GestorPersistente, SesionNoEncontrada, ConflictoSesion
+import itertools
+import tableros
+import estrategias
+from estrategias import ESTRATEGIAS
+from juegos import JuegoMastermind, JuegoGrande, JuegoGeneralizado, TIPOS_JUEGO
+import plantillas
+import persistencia
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import metricas
+import json
+import zlib
+import simulacion
 
 app = Flask(__name__)
 CORS(app)
 
-class JuegoMastermind:
-    def __init__(self):
-        self.num_elementos = None
-        self.colores = []
-        self.posiciones = []
-        self.symbols = []
-        self.conocimiento = And()
-        self.universos = []
-        self.historial = []
-        self.intentos = 0
-        self.mostrar_debug = True  # Bandera para controlar la salida de depuración
-
-    def configurar_juego(self, num_elementos):
-        self.num_elementos = num_elementos
-        self.colores = [f"c{i}" for i in range(num_elementos)]
-        self.posiciones = [f"p{i}" for i in range(num_elementos)]
-        self.symbols = [Symbol(f"p{i}c{j}") for i in range(num_elementos) for j in range(num_elementos)]
-        self._inicializar_conocimiento()
-        self._generar_universos()
-        self.historial = []
-        self.intentos = -1
-        
-        if self.mostrar_debug:
-            print("\n=== CONFIGURACIÓN INICIAL ===")
-            print(f"Colores: {self.colores}")
-            print(f"Posiciones: {self.posiciones}")
-            print(f"Total universos posibles: {len(self.universos)}")
-            self._imprimir_universos()
-        
-        return {"status": "success", "message": f"Juego configurado con {num_elementos} colores"}
-
-    def _imprimir_universos(self):
-        """Muestra los universos actuales en la consola"""
-        print("\nUniversos posibles:")
-        for i, universo in enumerate(self.universos):
-            print(f"{i+1}. {universo}")
-        print(f"Total: {len(self.universos)} universos")
-
-    def manejar_respuesta(self, propuesta, aciertos):
-        if aciertos == self.num_elementos:
-            # Asegúrate que esta parte esté EXACTAMENTE así
-            return {
-                "status": "ganado",  # Debe ser "ganado" exactamente
-                "combinacion": propuesta,
-                "mensaje": "¡Combinación correcta encontrada!"
-            }
-
-    def _inicializar_conocimiento(self):
-        self.conocimiento = And()
-        
-        # Cada color aparece exactamente una vez
-        for colo in self.colores:
-            self.conocimiento.add(Or(*[Symbol(f"p{i}{colo}") for i in range(self.num_elementos)]))
-        
-        # Restricciones de unicidad
-        for colo in self.colores:
-            for i in range(self.num_elementos):
-                for j in range(self.num_elementos):
-                    if i != j:
-                        self.conocimiento.add(
-                            Implication(Symbol(f"p{i}{colo}"), Not(Symbol(f"p{j}{colo}"))))
-
-        for i in range(self.num_elementos):
-            for colo in self.colores:
-                for colo2 in self.colores:
-                    if colo != colo2:
-                        self.conocimiento.add(
-                            Implication(Symbol(f"p{i}{colo}"), Not(Symbol(f"p{i}{colo2}"))))
-
-    def _generar_universos(self):
-        self.universos = []
-        for perm in permutations(self.colores):
-            self.universos.append([f"p{i}{perm[i]}" for i in range(self.num_elementos)])
-
-    def _filtrar_universos(self):
-        universos_validos = []
-        for universo in self.universos:
-            if not model_check(self.conocimiento, Not(And(*[Symbol(v) for v in universo]))):
-                universos_validos.append(universo)
-        return universos_validos
-
-    def generar_propuesta(self):
-        universos_validos = self._filtrar_universos()
-        
-        if self.mostrar_debug:
-            print(f"\n=== INTENTO {self.intentos + 1} ===")
-            print(f"Universos válidos: {len(universos_validos)}")
-            if len(universos_validos) <= 10:  # Solo mostrar si son pocos
-                for i, u in enumerate(universos_validos):
-                    print(f"{i+1}. {u}")
-        
-        if not universos_validos:
-            if self.mostrar_debug:
-                print("¡No hay más universos válidos!")
-            return None
-        
-        propuesta = random.choice(universos_validos)
-        self.intentos += 1
-        self.historial.append({
-            "intento": self.intentos,
-            "propuesta": propuesta.copy(),
-            "universos_restantes": len(universos_validos)
-        })
-        
-        if self.mostrar_debug:
-            print(f"\nPropuesta generada: {propuesta}")
-        
-        return propuesta
-
-    def procesar_respuesta(self, propuesta, aciertos):
-        if self.mostrar_debug:
-            print(f"\nRespuesta recibida: {aciertos} aciertos")
-        
-        if aciertos == self.num_elementos:
-            if self.mostrar_debug:
-                print("¡Solución correcta encontrada!")
-            return {"status": "ganado", "combinacion": propuesta}
-        
-        if aciertos == 0:
-            if self.mostrar_debug:
-                print("Descartando todas las variables de la propuesta")
-            for simbolo in propuesta:
-                self.conocimiento.add(Not(Symbol(simbolo)))
-            return {"status": "continua", "message": f"Descartadas {len(propuesta)} variables"}
-        
-        # Lógica para aciertos parciales
-        if self.mostrar_debug:
-            print(f"Procesando {aciertos} aciertos parciales...")
-        
-        combinaciones_correctas = list(combinations(propuesta, aciertos))
-        opciones_disjuntas = []
-        
-        for combinacion in combinaciones_correctas:
-            falsas = [v for v in propuesta if v not in combinacion]
-            opciones = [Symbol(v) for v in combinacion] + [Not(Symbol(v)) for v in falsas]
-            opciones_disjuntas.append(And(*opciones))
-        
-        self.conocimiento.add(Or(*opciones_disjuntas))
-        
-        # Mostrar cómo queda el conocimiento
-        if self.mostrar_debug:
-            print("\nConocimiento actualizado:")
-            universos_validos = self._filtrar_universos()
-            print(f"Universos restantes válidos: {len(universos_validos)}")
-            if len(universos_validos) <= 10:
-                for i, u in enumerate(universos_validos):
-                    print(f"{i+1}. {u}")
-        
-        return {"status": "continua", "message": f"Actualizado con {aciertos} aciertos"}
-
-juego = JuegoMastermind()
-
-# Endpoints (igual que antes)
+def _restaurar_juego(datos):
+    return persistencia.restaurar(datos, TIPOS_JUEGO)
+
+def _memoria_juego(juego):
+    return juego.memoria()
+
+# Memoria máxima de las partidas en este proceso, en MiB (MASTERMIND_MEMORIA)
+MAX_BYTES_SESIONES = int(os.environ.get("MASTERMIND_MEMORIA", 1024)) << 20
+
+gestor = None  # Lo crea iniciar_servidor
+
+def iniciar_servidor():
+    """Efectos de arranque que solo corresponden al proceso que atiende peticiones.
+
+    Los trabajadores de forkserver o spawn importan de nuevo el módulo
+    principal; si este es app.py no deben abrir otro gestor, otro pool ni
+    construir plantillas.
+    """
+    global gestor
+    # Con MASTERMIND_SESIONES=<fichero .db> las partidas se guardan en SQLite y
+    # varios procesos del servidor pueden atender a la misma partida
+    if os.environ.get("MASTERMIND_SESIONES"):
+        gestor = GestorPersistente(JuegoMastermind, os.environ["MASTERMIND_SESIONES"],
+                                   persistencia.serializar, _restaurar_juego,
+                                   max_sesiones=10000, ttl=3600,
+                                   max_bytes=MAX_BYTES_SESIONES, medir=_memoria_juego)
+    else:
+        gestor = GestorSesiones(JuegoMastermind, max_sesiones=10000, ttl=3600,
+                                max_bytes=MAX_BYTES_SESIONES, medir=_memoria_juego)
+    # Pool de procesos de las estrategias, creado antes de atender peticiones;
+    # MASTERMIND_PROCESOS fija sus trabajadores (0: se puntúa en cada petición)
+    if os.environ.get("MASTERMIND_PROCESOS") != "0":
+        estrategias.iniciar_pool(int(os.environ.get("MASTERMIND_PROCESOS", 0)) or None)
+    # Tamaños cuya plantilla se construye al arrancar, p. ej. MASTERMIND_PLANTILLAS="4 5 6 8"
+    plantillas.precalentar(
+        (int(n) for n in os.environ.get("MASTERMIND_PLANTILLAS", "").replace(",", " ").split()),
+        MAX_N_UNIVERSOS)
+
+metricas.registro.registrar(metricas.Medidor(
+    "mastermind_sesiones_activas", "Partidas en memoria", lambda: len(gestor)))
+metricas.registro.registrar(metricas.Medidor(
+    "mastermind_sesiones_bytes", "Bytes estimados de las partidas en memoria",
+    lambda: gestor.bytes))
+
+def _id_juego():
+    """El id de partida llega en el cuerpo JSON o como parámetro de la URL"""
+    data = request.get_json(silent=True) or {}
+    return data.get('id_juego') or request.args.get('id_juego')
+
+class ParametroInvalido(ValueError):
+    pass
+
+def _parametro_entero(nombre, defecto=None, minimo=0, maximo=None, obligatorio=False):
+    """Entero del cuerpo JSON o de la URL, dentro de [minimo, maximo].
+
+    En JSON tiene que ser un número entero ("2", 2.5 o true no valen); en la
+    URL, el texto de un entero.
+    """
+    data = request.get_json(silent=True) or {}
+    valor = data.get(nombre)
+    if valor is None:
+        valor = request.args.get(nombre)
+        if valor is not None:
+            try:
+                valor = int(valor)
+            except ValueError:
+                raise ParametroInvalido(nombre) from None
+    elif isinstance(valor, bool) or not isinstance(valor, int):
+        raise ParametroInvalido(nombre)
+    if valor is None:
+        if obligatorio:
+            raise ParametroInvalido(nombre)
+        return defecto
+    if valor < minimo or (maximo is not None and valor > maximo):
+        raise ParametroInvalido(nombre)
+    return valor
+
+def _historial_desde(juego, resultado, desde):
+    """Añade el historial completo o, si el cliente indica `desde`, solo lo nuevo"""
+    if desde is None:
+        resultado["historial"] = juego.historial
+    else:
+        resultado["historial"] = juego.historial[desde:]
+        resultado["desde"] = desde
+        resultado["total"] = len(juego.historial)
+    return resultado
+
+@app.before_request
+def _iniciar_cronometro():
+    request.inicio = time.perf_counter()
+
+@app.after_request
+def _registrar_peticion(respuesta):
+    inicio = getattr(request, "inicio", None)
+    if inicio is not None and request.url_rule is not None:
+        metricas.peticiones.observar(time.perf_counter() - inicio, request.url_rule.rule)
+    return respuesta
+
+@app.errorhandler(SesionNoEncontrada)
+def sesion_no_encontrada(error):
+    return jsonify({"error": "Juego no encontrado"}), 404
+
+@app.errorhandler(ParametroInvalido)
+def parametro_invalido(error):
+    return jsonify({"error": f"Parámetro no válido: {error}"}), 400
+
+@app.errorhandler(ConflictoSesion)
+def conflicto_sesion(error):
+    return jsonify({"error": "La partida cambió en otra petición; vuelve a intentarlo"}), 409
+
+MAX_CODIGOS = 1 << 20  # Tamaño máximo del tablero generalizado
+MAX_N_UNIVERSOS = 10  # Por encima se usa el motor de emparejamientos en vez de enumerar n!
+MAX_N_EMPAREJAMIENTOS = 20  # Hasta donde la búsqueda responde en segundos
+MOTORES = {"universos": JuegoMastermind, "emparejamientos": JuegoGrande}
+MAX_N_MOTOR = {"universos": MAX_N_UNIVERSOS, "emparejamientos": MAX_N_EMPAREJAMIENTOS}
+
+# Endpoints
 @app.route('/iniciar', methods=['POST'])
 def iniciar_juego():
     data = request.json
-    num_elementos = data.get('num_elementos', 4)
-    return jsonify(juego.configurar_juego(num_elementos))
+    estrategia = data.get('estrategia')
+    if estrategia is not None and estrategia not in ESTRATEGIAS:
+        return jsonify({"error": f"Estrategia desconocida: {estrategia}"}), 400
+    if 'colores' in data or 'posiciones' in data:
+        return _iniciar_generalizado(data, estrategia)
+    num_elementos = _parametro_entero('num_elementos', 4)
+    motor = data.get('motor', "universos" if num_elementos <= MAX_N_UNIVERSOS else "emparejamientos")
+    if motor not in MOTORES:
+        return jsonify({"error": f"Motor desconocido: {motor}"}), 400
+    if not 1 <= num_elementos <= MAX_N_MOTOR[motor]:
+        return jsonify({"error": f"El motor {motor} admite de 1 a {MAX_N_MOTOR[motor]} colores"}), 400
+    id_juego = gestor.crear(MOTORES[motor])
+    with gestor.usar(id_juego) as juego:
+        resultado = juego.configurar_juego(num_elementos, estrategia)
+    resultado["id_juego"] = id_juego
+    return jsonify(resultado)
+
+def _iniciar_generalizado(data, estrategia):
+    """Tablero de colores × posiciones con repetición y respuesta de negras y blancas"""
+    colores = _parametro_entero('colores', 6)
+    posiciones = _parametro_entero('posiciones', 4)
+    repeticion = data.get('repeticion', True)
+    if colores < 1 or posiciones < 1 or (not repeticion and colores < posiciones):
+        return jsonify({"error": "Tablero sin códigos posibles"}), 400
+    # Primero los límites por dimensión: así c ** p nunca se calcula con p enorme
+    if not tableros.admitido(colores, posiciones):
+        return jsonify({"error": f"Tablero demasiado grande (máximo {tableros.MAX_COLORES} colores, "
+                                 f"{tableros.MAX_POSICIONES} posiciones y "
+                                 f"{tableros.MAX_HISTOGRAMAS} celdas de histograma)"}), 400
+    if tableros.total(colores, posiciones) > MAX_CODIGOS:
+        return jsonify({"error": f"Tablero demasiado grande (máximo {MAX_CODIGOS} códigos)"}), 400
+    id_juego = gestor.crear(JuegoGeneralizado)
+    with gestor.usar(id_juego) as juego:
+        resultado = juego.configurar_juego(colores, posiciones, estrategia, repeticion)
+    resultado["id_juego"] = id_juego
+    return jsonify(resultado)
 
 @app.route('/propuesta', methods=['GET'])
 def obtener_propuesta():
-    propuesta = juego.generar_propuesta()
-    if not propuesta:
-        return jsonify({"error": "No hay más combinaciones posibles"}), 400
-    return jsonify({
-        "propuesta": propuesta,
-        "intento_actual": juego.intentos,
-        "universos_restantes": juego.historial[-1]["universos_restantes"] if juego.historial else 0
-    })
+    with gestor.usar(_id_juego()) as juego:
+        propuesta = juego.generar_propuesta()
+        if not propuesta:
+            return jsonify({"error": "No hay más combinaciones posibles"}), 400
+        return jsonify({
+            "propuesta": propuesta,
+            "intento_actual": juego.intentos,
+            "universos_restantes": juego.historial[-1]["universos_restantes"] if juego.historial else 0,
+            # Falso cuando el motor de emparejamientos solo ha podido estimarlos
+            "universos_exactos": juego.historial[-1].get("exacto", True) if juego.historial else True
+        })
 
 @app.route('/responder', methods=['POST'])
 def responder():
     data = request.json
-    resultado = juego.procesar_respuesta(data['propuesta'], data['aciertos'])
-    resultado["historial"] = juego.historial
-    return jsonify(resultado)
+    desde = _parametro_entero('desde')
+    with gestor.usar(_id_juego()) as juego:
+        # La respuesta se valida antes de tocar la partida: un valor absurdo
+        # vaciaría los supervivientes sin dar ningún error
+        if isinstance(juego, JuegoGeneralizado):
+            negras = _parametro_entero('negras', obligatorio=True)
+            blancas = _parametro_entero('blancas', 0)
+            if negras + blancas > juego.num_posiciones:
+                return jsonify({"error": "Respuesta imposible para el tablero"}), 400
+            resultado = juego.procesar_respuesta(data['propuesta'], negras, blancas)
+        else:
+            aciertos = _parametro_entero('aciertos', maximo=juego.num_elementos, obligatorio=True)
+            resultado = juego.procesar_respuesta(data['propuesta'], aciertos)
+        return jsonify(_historial_desde(juego, resultado, desde))
+
+@app.route('/deshacer', methods=['POST'])
+def deshacer():
+    desde = _parametro_entero('desde')
+    with gestor.usar(_id_juego()) as juego:
+        resultado = juego.deshacer_respuesta()
+        if resultado["status"] == "error":
+            return jsonify(resultado), 400
+        return jsonify(_historial_desde(juego, resultado, desde))
 
 @app.route('/historial', methods=['GET'])
 def obtener_historial():
-    return jsonify({
-        "historial": juego.historial,
-        "total_intentos": juego.intentos
-    })
+    """Historial paginado con `desde` y `limite`; responde 304 si no ha cambiado.
+
+    La ETag es la revisión de la partida, que avanza al configurarla, con
+    cada propuesta y con cada deshacer, así que se comprueba antes de
+    construir nada. Responder no la cambia: el historial solo guarda
+    propuestas y el recuento de intentos lo mueve la propuesta.
+    """
+    id_juego = _id_juego()
+    desde = _parametro_entero('desde', 0)
+    limite = _parametro_entero('limite')
+    with gestor.usar(id_juego, solo_lectura=True) as juego:
+        etag = f"{id_juego}-{juego.revision}"
+        if request.if_none_match.contains(etag):
+            respuesta = Response(status=304)
+        else:
+            fin = None if limite is None else desde + limite
+            total = len(juego.historial)
+            respuesta = jsonify({
+                "historial": juego.historial[desde:fin],
+                "total_intentos": juego.intentos,
+                "desde": desde,
+                "total": total,
+                "siguiente": fin if fin is not None and fin < total else None
+            })
+    respuesta.set_etag(etag)
+    return respuesta
+
+TAM_PAGINA_UNIVERSOS = 1000
+MAX_PAGINA_UNIVERSOS = 100000
+LINEAS_POR_ENVIO = 256  # Universos por trozo comprimido del flujo
+
+@app.route('/universos', methods=['GET'])
+def listar_universos():
+    """Universos que siguen siendo posibles, uno por línea en NDJSON.
+
+    Se generan al recorrer la respuesta: el motor de emparejamientos los
+    enumera bajo demanda y los demás decodifican los rangos por bloques.
+    Una página con menos de `limite` líneas es la última. Si el cliente
+    acepta gzip, el flujo se comprime a medida que se envía.
+    """
+    desde = _parametro_entero('desde', 0)
+    limite = min(_parametro_entero('limite', TAM_PAGINA_UNIVERSOS), MAX_PAGINA_UNIVERSOS)
+    with gestor.usar(_id_juego(), solo_lectura=True) as juego:
+        # El generador captura el estado actual, que las peticiones siguientes
+        # sustituyen en vez de modificar: se puede consumir sin el lock
+        propuestas = juego.iterar_supervivientes(desde, limite)
+    lineas = (json.dumps(propuesta) + "\n" for propuesta in propuestas)
+    cabeceras = {}
+    # `in` también sería cierto con "gzip;q=0", que lo rechaza expresamente
+    if request.accept_encodings["gzip"] > 0:
+        lineas = _comprimir(lineas)
+        cabeceras = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    return Response(stream_with_context(lineas), mimetype="application/x-ndjson",
+                    headers=cabeceras)
+
+def _comprimir(lineas):
+    """gzip incremental: vacía el compresor cada LINEAS_POR_ENVIO líneas"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for trozo in iter(lambda: list(itertools.islice(lineas, LINEAS_POR_ENVIO)), []):
+        yield compresor.compress("".join(trozo).encode()) + compresor.flush(zlib.Z_SYNC_FLUSH)
+    yield compresor.flush()
+
+MAX_PARTIDAS_SIMULACION = 50000
+# Cada simulación ya reparte sus partidas entre todos los núcleos
+MAX_SIMULACIONES = 1
+_cupo_simulaciones = threading.BoundedSemaphore(MAX_SIMULACIONES)
+
+@app.route('/simular', methods=['POST'])
+def simular():
+    """Juega partidas automáticas y emite el resumen acumulado como NDJSON"""
+    data = request.get_json(silent=True) or {}
+    # Cada partida se juega con el motor de universos, que enumera n!
+    num_elementos = _parametro_entero('num_elementos', 4, minimo=1, maximo=MAX_N_UNIVERSOS)
+    estrategia = data.get('estrategia')
+    muestra = _parametro_entero('muestra', minimo=1)
+    procesos = _parametro_entero('procesos', minimo=1, maximo=os.cpu_count() or 1)
+    trozo = _parametro_entero('trozo', simulacion.TAM_TROZO, minimo=1)
+    semilla = _parametro_entero('semilla', 0)
+    if estrategia is not None and estrategia not in ESTRATEGIAS:
+        return jsonify({"error": f"Estrategia desconocida: {estrategia}"}), 400
+    partidas = simulacion.num_partidas(num_elementos, muestra)
+    if partidas > MAX_PARTIDAS_SIMULACION:
+        return jsonify({"error": f"Demasiadas partidas ({partidas}); indica una muestra menor"}), 400
+
+    if not _cupo_simulaciones.acquire(blocking=False):
+        return jsonify({"error": "Hay otra simulación en curso; vuelve a intentarlo más tarde"}), 503
+
+    resumenes = simulacion.simular(num_elementos, estrategia, muestra, procesos, trozo, semilla)
+    lineas = (json.dumps(resumen, ensure_ascii=False) + "\n" for resumen in resumenes)
+    respuesta = Response(stream_with_context(lineas), mimetype="application/x-ndjson")
+    # El cupo se libera al cerrar la respuesta, se haya enviado entera o no
+    respuesta.call_on_close(_cupo_simulaciones.release)
+    return respuesta
+
+@app.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    return metricas.registro.exportar(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+# Los hijos de multiprocessing reciben su nombre antes de reimportar el módulo
+# principal; los trabajadores de gunicorn no salen de multiprocessing y lo conservan
+if multiprocessing.current_process().name == "MainProcess":
+    iniciar_servidor()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    logging.basicConfig(level=os.environ.get("MASTERMIND_LOG", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app.run(debug=True, port=5000, threaded=True)
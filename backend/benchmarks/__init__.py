@@ -0,0 +1,6 @@
+"""Benchmarks de configuración, propuesta y respuesta por tamaño de tablero.
+
+Uso, desde backend/:
+    python -m benchmarks --tamanos 3 4 5 6 7 8 --salida resultados.json
+    python -m benchmarks --comparar base.json --salida resultados.json
+"""
@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+from benchmarks import escenarios, informe
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mide el juego por tamaño de tablero")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[3, 4, 5, 6, 7, 8])
+    parser.add_argument("--partidas", type=int, default=20,
+                        help="partidas por tamaño, tanto por métodos como por rutas")
+    parser.add_argument("--estrategia", default=None)
+    parser.add_argument("--consultas", type=int, default=20,
+                        help="llamadas a model_check por tamaño")
+    parser.add_argument("--sin-endpoints", action="store_true")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="archivo JSON para los resultados")
+    parser.add_argument("--comparar", help="JSON de referencia contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    escenarios.sembrar(args.semilla)
+    resultados = {}
+    for n in args.tamanos:
+        tiempos, intentos, memoria = escenarios.medir_tamano(
+            n, args.partidas, args.estrategia, args.consultas, not args.sin_endpoints)
+        resultados[str(n)] = informe.resultado_tamano(tiempos, intentos, memoria)
+
+    datos = informe.documento(resultados, vars(args))
+    informe.imprimir(datos)
+    if args.salida:
+        informe.guardar(datos, args.salida)
+
+    if args.comparar:
+        regresiones = informe.comparar(informe.cargar(args.comparar), datos, args.tolerancia)
+        for tamano, nombre, antes, ahora in regresiones:
+            print(f"REGRESIÓN n={tamano} {nombre}: {antes:.6g} -> {ahora:.6g}")
+        if regresiones:
+            sys.exit(1)
+        print("\nSin regresiones respecto a la referencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+import app as servidor
+from juegos import JuegoMastermind
+from logic import And, Not, Symbol, model_check
+
+
+def secreto_aleatorio(n):
+    return [f"p{i}c{color}" for i, color in enumerate(random.sample(range(n), n))]
+
+
+def contar_aciertos(propuesta, secreto):
+    return sum(a == b for a, b in zip(propuesta, secreto))
+
+
+def _cronometrar(tiempos, clave, funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    tiempos.setdefault(clave, []).append(time.perf_counter() - inicio)
+    return resultado
+
+
+def partida_metodos(n, estrategia, tiempos):
+    """Juega una partida contra un secreto aleatorio llamando a JuegoMastermind"""
+    juego = JuegoMastermind()
+    juego.especular = False  # Los hilos de fondo competirían con las llamadas cronometradas
+    _cronometrar(tiempos, "configurar_juego", juego.configurar_juego, n, estrategia)
+    secreto = secreto_aleatorio(n)
+    while True:
+        propuesta = _cronometrar(tiempos, "generar_propuesta", juego.generar_propuesta)
+        if propuesta is None:
+            raise RuntimeError(f"Sin universos válidos para el secreto {secreto}")
+        resultado = _cronometrar(tiempos, "procesar_respuesta", juego.procesar_respuesta,
+                                 propuesta, contar_aciertos(propuesta, secreto))
+        if resultado["status"] == "ganado":
+            return juego.intentos + 1
+
+
+def partida_endpoints(cliente, n, estrategia, tiempos):
+    """Juega una partida completa a través de las rutas de Flask"""
+    cuerpo = {"num_elementos": n}
+    if estrategia is not None:
+        cuerpo["estrategia"] = estrategia
+    respuesta = _cronometrar(tiempos, "POST /iniciar", cliente.post, "/iniciar", json=cuerpo)
+    id_juego = respuesta.get_json()["id_juego"]
+    with servidor.gestor.usar(id_juego) as juego:
+        juego.especular = False
+    secreto = secreto_aleatorio(n)
+    intentos = 0
+    while True:
+        respuesta = _cronometrar(tiempos, "GET /propuesta", cliente.get, "/propuesta",
+                                 query_string={"id_juego": id_juego})
+        propuesta = respuesta.get_json()["propuesta"]
+        intentos += 1
+        respuesta = _cronometrar(tiempos, "POST /responder", cliente.post, "/responder",
+                                 json={"id_juego": id_juego, "propuesta": propuesta,
+                                       "aciertos": contar_aciertos(propuesta, secreto)})
+        if respuesta.get_json()["status"] == "ganado":
+            servidor.gestor.eliminar(id_juego)
+            return intentos
+
+
+def consultas_model_check(n, consultas, tiempos):
+    """Entailment de universos aleatorios contra la base de conocimiento inicial"""
+    juego = JuegoMastermind()
+    juego.configurar_juego(n)
+    for _ in range(consultas):
+        universo = secreto_aleatorio(n)
+        _cronometrar(tiempos, "model_check", model_check, juego.conocimiento,
+                     Not(And(*[Symbol(v) for v in universo])))
+
+
+def memoria_pico(n, estrategia):
+    """Bytes de pico (tracemalloc) de una partida completa, en una pasada aparte"""
+    tracemalloc.start()
+    try:
+        partida_metodos(n, estrategia, {})
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def medir_tamano(n, partidas, estrategia=None, consultas=20, endpoints=True):
+    tiempos = {}
+    intentos = [partida_metodos(n, estrategia, tiempos) for _ in range(partidas)]
+    if endpoints:
+        cliente = servidor.app.test_client()
+        for _ in range(partidas):
+            partida_endpoints(cliente, n, estrategia, tiempos)
+    consultas_model_check(n, consultas, tiempos)
+    return tiempos, intentos, memoria_pico(n, estrategia)
+
+
+def sembrar(semilla):
+    random.seed(semilla)
+    np.random.seed(semilla)
@@ -0,0 +1,85 @@
+import json
+import platform
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def resumir(muestras):
+    valores = np.asarray(muestras, dtype=float)
+    resumen = {f"p{p}": float(np.percentile(valores, p)) for p in PERCENTILES}
+    resumen["max"] = float(valores.max())
+    resumen["media"] = float(valores.mean())
+    resumen["n"] = len(valores)
+    return resumen
+
+
+def resultado_tamano(tiempos, intentos, memoria):
+    return {
+        "latencias": {clave: resumir(muestras) for clave, muestras in tiempos.items()},
+        "intentos": resumir(intentos),
+        "memoria_pico": memoria,
+    }
+
+
+def documento(resultados, argumentos):
+    return {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "argumentos": argumentos,
+        },
+        "resultados": resultados,
+    }
+
+
+def guardar(datos, ruta):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, indent=2, ensure_ascii=False)
+
+
+def cargar(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def comparar(base, actual, tolerancia=0.25, minimo=0.0005):
+    """Lista de regresiones: métricas que empeoran más que la tolerancia relativa.
+
+    Las latencias cuyo aumento absoluto no llega a `minimo` segundos se
+    consideran ruido.
+    """
+    regresiones = []
+    for tamano, medido in actual["resultados"].items():
+        referencia = base["resultados"].get(tamano)
+        if referencia is None:
+            continue
+        metricas = []
+        for clave, resumen in medido["latencias"].items():
+            if clave in referencia["latencias"]:
+                for p in ("p50", "p90"):
+                    metricas.append((f"{clave} {p}", referencia["latencias"][clave][p],
+                                     resumen[p], minimo))
+        metricas.append(("intentos media", referencia["intentos"]["media"],
+                         medido["intentos"]["media"], 0))
+        metricas.append(("memoria_pico", referencia["memoria_pico"],
+                         medido["memoria_pico"], 0))
+        for nombre, antes, ahora, umbral in metricas:
+            if ahora > antes * (1 + tolerancia) and ahora - antes > umbral:
+                regresiones.append((tamano, nombre, antes, ahora))
+    return regresiones
+
+
+def imprimir(datos):
+    for tamano, medido in datos["resultados"].items():
+        intentos = medido["intentos"]
+        print(f"\n== n={tamano}: intentos media {intentos['media']:.2f} "
+              f"max {intentos['max']:.0f}, memoria pico "
+              f"{medido['memoria_pico'] / 1024:.0f} KiB")
+        for clave, resumen in medido["latencias"].items():
+            columnas = "  ".join(f"{p} {resumen[p] * 1000:9.3f} ms"
+                                 for p in ("p50", "p90", "p99", "max"))
+            print(f"  {clave:<20} {columnas}")
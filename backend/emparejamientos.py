@@ -0,0 +1,442 @@
+"""Motor para tableros grandes: propagación sobre emparejamientos sin enumerar n!.
+
+El estado es una matriz posición × color de asignaciones todavía posibles
+(una máscara de bits de colores por posición) más la lista de respuestas
+(fila, aciertos), con cada fila como tupla de colores. La propagación combina:
+
+- cotas de aciertos: si los aciertos aún posibles de una respuesta son
+  justo los que faltan, todos son obligatorios; si los seguros ya bastan,
+  el resto se descarta;
+- consistencia de alldifferent (Régin): una arista posición-color solo se
+  conserva si pertenece a algún emparejamiento perfecto, lo que se
+  comprueba con un emparejamiento de Hopcroft–Karp y las componentes
+  fuertemente conexas del grafo alternante.
+
+Sobre esa propagación se busca con vuelta atrás una permutación consistente,
+ramificando sobre los aciertos de cada respuesta (una vez decididos todos,
+cualquier emparejamiento perfecto sirve), y se cuentan los universos
+restantes, de forma exacta si el árbol es pequeño o estimada con sondas
+aleatorias de Knuth si no.
+"""
+import itertools
+import random
+from collections import deque
+from functools import lru_cache
+
+LIMITE_CONTEO = 200  # Nodos de búsqueda para el conteo exacto antes de estimar
+SONDAS = 16  # Caminos aleatorios para estimar el número de universos
+NODOS_REINICIO = 32  # Unidad de la serie de Luby para los reinicios de la búsqueda
+
+
+@lru_cache(maxsize=1 << 16)
+def colores_de(mascara):
+    """Colores de una máscara de bits, en orden creciente"""
+    colores = []
+    while mascara:
+        bit = mascara & -mascara
+        colores.append(bit.bit_length() - 1)
+        mascara ^= bit
+    return tuple(colores)
+
+
+def hopcroft_karp(posibles, n, rng=None):
+    """Emparejamiento máximo posición -> color; lista con None en las libres.
+
+    Con `rng` los colores de cada posición se prueban en orden aleatorio, de
+    modo que se obtiene un emparejamiento perfecto cualquiera y no siempre el mismo.
+    """
+    pareja_pos = [None] * n
+    pareja_color = [None] * n
+    adyacentes = [colores_de(mascara) for mascara in posibles]
+    if rng is not None:
+        adyacentes = [rng.sample(colores, len(colores)) for colores in adyacentes]
+    infinito = n + 1
+
+    while True:
+        # BFS por capas desde las posiciones libres
+        distancia = [infinito] * n
+        cola = deque()
+        for i in range(n):
+            if pareja_pos[i] is None:
+                distancia[i] = 0
+                cola.append(i)
+        hay_camino = False
+        while cola:
+            i = cola.popleft()
+            for color in adyacentes[i]:
+                j = pareja_color[color]
+                if j is None:
+                    hay_camino = True
+                elif distancia[j] == infinito:
+                    distancia[j] = distancia[i] + 1
+                    cola.append(j)
+        if not hay_camino:
+            return pareja_pos
+
+        # DFS iterativo de caminos de aumento que respetan las capas
+        for inicio in range(n):
+            if pareja_pos[inicio] is not None:
+                continue
+            pila = [(inicio, iter(adyacentes[inicio]))]
+            while pila:
+                i, colores = pila[-1]
+                for color in colores:
+                    j = pareja_color[color]
+                    if j is None:
+                        # Camino encontrado: se invierten sus aristas
+                        for posicion, _ in reversed(pila):
+                            anterior = pareja_pos[posicion]
+                            pareja_pos[posicion] = color
+                            pareja_color[color] = posicion
+                            color = anterior
+                        pila = []
+                        break
+                    if distancia[j] == distancia[i] + 1:
+                        pila.append((j, iter(adyacentes[j])))
+                        break
+                else:
+                    distancia[i] = infinito  # Sin salida: no se vuelve a visitar
+                    pila.pop()
+
+
+def _componentes(sucesores):
+    """Componente fuertemente conexa de cada nodo (Tarjan iterativo)"""
+    total = len(sucesores)
+    indice = [None] * total
+    bajo = [0] * total
+    componente = [None] * total
+    en_pila = [False] * total
+    pila = []
+    contador = 0
+    for raiz in range(total):
+        if indice[raiz] is not None:
+            continue
+        llamadas = [(raiz, iter(sucesores[raiz]))]
+        indice[raiz] = bajo[raiz] = contador
+        contador += 1
+        pila.append(raiz)
+        en_pila[raiz] = True
+        while llamadas:
+            nodo, hijos = llamadas[-1]
+            for hijo in hijos:
+                if indice[hijo] is None:
+                    indice[hijo] = bajo[hijo] = contador
+                    contador += 1
+                    pila.append(hijo)
+                    en_pila[hijo] = True
+                    llamadas.append((hijo, iter(sucesores[hijo])))
+                    break
+                if en_pila[hijo]:
+                    bajo[nodo] = min(bajo[nodo], indice[hijo])
+            else:
+                llamadas.pop()
+                if llamadas:
+                    padre = llamadas[-1][0]
+                    bajo[padre] = min(bajo[padre], bajo[nodo])
+                if bajo[nodo] == indice[nodo]:
+                    while True:
+                        miembro = pila.pop()
+                        en_pila[miembro] = False
+                        componente[miembro] = nodo
+                        if miembro == nodo:
+                            break
+    return componente
+
+
+def _podar_alldifferent(posibles, n):
+    """Quita las aristas que no están en ningún emparejamiento perfecto; None si no hay"""
+    pareja = hopcroft_karp(posibles, n)
+    if None in pareja:
+        return None
+    # Nodos 0..n-1 posiciones y n..2n-1 colores; la arista emparejada va de la
+    # posición al color y las demás al revés. Con un emparejamiento perfecto
+    # no quedan colores libres, así que una arista libre se conserva si y solo
+    # si sus extremos están en la misma componente fuertemente conexa.
+    sucesores = [[n + pareja[i]] for i in range(n)] + [[] for _ in range(n)]
+    for i, mascara in enumerate(posibles):
+        for color in colores_de(mascara):
+            if color != pareja[i]:
+                sucesores[n + color].append(i)
+    componente = _componentes(sucesores)
+    reducidos = []
+    for i, mascara in enumerate(posibles):
+        for color in colores_de(mascara):
+            if color != pareja[i] and componente[i] != componente[n + color]:
+                mascara &= ~(1 << color)
+        reducidos.append(mascara)
+    return reducidos
+
+
+@lru_cache(maxsize=4096)
+def _aciertos_de(fila, n):
+    """Aristas posición-color de una fila como bits i * n + color de un entero"""
+    return sum(1 << (i * n + color) for i, color in enumerate(fila))
+
+
+def _aristas(posibles, n):
+    """(aristas abiertas, aristas de posiciones ya fijadas) en el formato de _aciertos_de"""
+    abiertas = fijas = 0
+    for i, mascara in enumerate(posibles):
+        abiertas |= mascara << (i * n)
+        if not mascara & (mascara - 1):
+            fijas |= mascara << (i * n)
+    return abiertas, fijas
+
+
+def _podar_aciertos(posibles, restricciones, n):
+    """Aplica las cotas de cada respuesta; None si alguna ya es imposible"""
+    posibles = list(posibles)
+    abiertas, fijas = _aristas(posibles, n)
+    for fila, aciertos in restricciones:
+        mascara = _aciertos_de(fila, n)
+        candidatos = (abiertas & mascara).bit_count()
+        seguros = (fijas & mascara).bit_count()
+        if seguros > aciertos or candidatos < aciertos:
+            return None
+        if seguros == candidatos:
+            continue
+        if candidatos == aciertos:
+            for i, color in enumerate(fila):
+                if posibles[i] >> color & 1:
+                    posibles[i] = 1 << color
+        elif seguros == aciertos:
+            for i, color in enumerate(fila):
+                if posibles[i] >> color & 1 and posibles[i] != 1 << color:
+                    posibles[i] &= ~(1 << color)
+        else:
+            continue
+        abiertas, fijas = _aristas(posibles, n)
+    return posibles
+
+
+def propagar(posibles, restricciones, n):
+    """Punto fijo de ambas podas; devuelve la matriz reducida o None si no hay universos"""
+    consistente = False  # Si `posibles` ya superó la poda de alldifferent
+    while True:
+        reducidos = _podar_aciertos(posibles, restricciones, n)
+        if reducidos is None or (consistente and reducidos == posibles):
+            return reducidos
+        reducidos = _podar_alldifferent(reducidos, n)
+        if reducidos is None or reducidos == posibles:
+            return reducidos
+        posibles = reducidos
+        consistente = True
+
+
+def _ramificar(posibles):
+    """Posición sin fijar con menos colores posibles, o None si todas están fijas"""
+    mejor = None
+    for i, mascara in enumerate(posibles):
+        if mascara & (mascara - 1) and (
+                mejor is None or bin(mascara).count("1") < bin(posibles[mejor]).count("1")):
+            mejor = i
+    return mejor
+
+
+def _ramificar_aciertos(posibles, restricciones, n, rng):
+    """Acierto sin decidir de la respuesta más ajustada: (posición, color, probabilidad).
+
+    La probabilidad es la fracción de dudosos que todavía tiene que acertar.
+    Devuelve None si todas las respuestas tienen ya sus aciertos decididos:
+    entonces cualquier emparejamiento perfecto de la matriz es consistente.
+    """
+    abiertas, fijas = _aristas(posibles, n)
+    dudosas = abiertas & ~fijas
+    mejor = None
+    for fila, aciertos in restricciones:
+        mascara = _aciertos_de(fila, n)
+        cuantas = (dudosas & mascara).bit_count()
+        if cuantas and (mejor is None or cuantas < mejor[0]):
+            faltan = aciertos - (fijas & mascara).bit_count()
+            mejor = (cuantas, dudosas & mascara, faltan)
+    if mejor is None:
+        return None
+    cuantas, aristas, faltan = mejor
+    bits = []
+    while aristas:
+        bit = aristas & -aristas
+        bits.append(bit.bit_length() - 1)
+        aristas ^= bit
+    i, color = divmod(rng.choice(bits), n)
+    return i, color, faltan / cuantas
+
+
+class _LimiteAlcanzado(Exception):
+    pass
+
+
+def buscar(posibles, restricciones, n, rng=random):
+    """Una permutación consistente con todas las respuestas, o None.
+
+    Cada intento recorre el árbol en un orden aleatorio distinto y se corta
+    al superar su límite de nodos, que sigue la serie de Luby (1, 1, 2, 1, 1,
+    2, 4, ...) multiplicada por NODOS_REINICIO: evita quedarse atascado en
+    una rama mala al principio de la búsqueda y sigue siendo completa.
+    """
+    for intento in itertools.count(1):
+        limite = NODOS_REINICIO * _luby(intento)
+        nodos = 0
+
+        def recorrer(posibles):
+            nonlocal nodos
+            nodos += 1
+            if nodos > limite:
+                raise _LimiteAlcanzado
+            posibles = propagar(posibles, restricciones, n)
+            if posibles is None:
+                return None
+            # Solo se ramifica sobre los aciertos: decididos todos, basta
+            # cualquier emparejamiento perfecto de lo que queda
+            rama = _ramificar_aciertos(posibles, restricciones, n, rng)
+            if rama is None:
+                return hopcroft_karp(posibles, n, rng)
+            i, color, probabilidad = rama
+            acierto = list(posibles)
+            acierto[i] = 1 << color
+            fallo = list(posibles)
+            fallo[i] &= ~(1 << color)
+            # Primero la rama más probable en un universo consistente
+            ramas = [acierto, fallo] if rng.random() < probabilidad else [fallo, acierto]
+            for hijo in ramas:
+                fila = recorrer(hijo)
+                if fila is not None:
+                    return fila
+            return None
+
+        try:
+            return recorrer(posibles)
+        except _LimiteAlcanzado:
+            pass
+
+
+def _luby(i):
+    """i-ésimo término (desde 1) de la serie de Luby"""
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+def contar(posibles, restricciones, n, limite=LIMITE_CONTEO):
+    """Número exacto de universos, o None si se visitan más de `limite` nodos"""
+    nodos = 0
+
+    def recorrer(posibles):
+        nonlocal nodos
+        nodos += 1
+        if nodos > limite:
+            raise _LimiteAlcanzado
+        posibles = propagar(posibles, restricciones, n)
+        if posibles is None:
+            return 0
+        # Igual que al buscar, primero se deciden los aciertos; después
+        # se cuentan los emparejamientos perfectos de lo que queda
+        rama = _ramificar_aciertos(posibles, restricciones, n, random)
+        if rama is not None:
+            i, color, _ = rama
+            acierto = list(posibles)
+            acierto[i] = 1 << color
+            fallo = list(posibles)
+            fallo[i] &= ~(1 << color)
+            return recorrer(acierto) + recorrer(fallo)
+        i = _ramificar(posibles)
+        if i is None:
+            return 1
+        total = 0
+        for color in colores_de(posibles[i]):
+            hijo = list(posibles)
+            hijo[i] = 1 << color
+            total += recorrer(hijo)
+        return total
+
+    try:
+        return recorrer(posibles)
+    except _LimiteAlcanzado:
+        return None
+
+
+def enumerar(posibles, restricciones, n):
+    """Genera bajo demanda todas las permutaciones consistentes, en un orden fijo"""
+    posibles = propagar(posibles, restricciones, n)
+    if posibles is None:
+        return
+    rama = _ramificar_aciertos(posibles, restricciones, n, _PRIMERO)
+    if rama is not None:
+        i, color, _ = rama
+        acierto = list(posibles)
+        acierto[i] = 1 << color
+        fallo = list(posibles)
+        fallo[i] &= ~(1 << color)
+        yield from enumerar(acierto, restricciones, n)
+        yield from enumerar(fallo, restricciones, n)
+        return
+    i = _ramificar(posibles)
+    if i is None:
+        yield [mascara.bit_length() - 1 for mascara in posibles]
+        return
+    for color in colores_de(posibles[i]):
+        hijo = list(posibles)
+        hijo[i] = 1 << color
+        yield from enumerar(hijo, restricciones, n)
+
+
+class _Primero:
+    """Sustituto de random que siempre elige el primer elemento"""
+
+    @staticmethod
+    def choice(secuencia):
+        return secuencia[0]
+
+
+_PRIMERO = _Primero()
+
+
+def estimar(posibles, restricciones, n, sondas=SONDAS, rng=random):
+    """Estimación insesgada de Knuth: media de 1 / probabilidad de cada camino aleatorio.
+
+    Los aciertos se deciden tomando cada rama con probabilidad parecida a la
+    de un universo consistente, para que pocas sondas mueran; con los
+    aciertos ya decididos la poda de alldifferent garantiza que cualquier
+    color que quede se puede completar, así que el resto del camino no falla.
+    """
+    suma = 0.0
+    for _ in range(sondas):
+        actual = posibles
+        peso = 1.0
+        while True:
+            actual = propagar(actual, restricciones, n)
+            if actual is None:
+                break
+            actual = list(actual)
+            rama = _ramificar_aciertos(actual, restricciones, n, rng)
+            if rama is not None:
+                i, color, probabilidad = rama
+                probabilidad = min(max(probabilidad, 0.1), 0.9)
+                if rng.random() < probabilidad:
+                    actual[i] = 1 << color
+                    peso /= probabilidad
+                else:
+                    actual[i] &= ~(1 << color)
+                    peso /= 1 - probabilidad
+                continue
+            i = _ramificar(actual)
+            if i is None:
+                suma += peso
+                break
+            colores = colores_de(actual[i])
+            peso *= len(colores)
+            actual[i] = 1 << rng.choice(colores)
+    return suma / sondas
+
+
+def restantes(posibles, restricciones, n, minimo=0):
+    """(universos restantes, exacto): conteo exacto si es barato, estimación si no.
+
+    `minimo` acota la estimación por abajo, p. ej. con 1 si ya se conoce un
+    universo consistente y todas las sondas han muerto antes de encontrarlo.
+    """
+    exacto = contar(posibles, restricciones, n)
+    if exacto is not None:
+        return exacto, True
+    return max(round(estimar(posibles, restricciones, n)), minimo), False
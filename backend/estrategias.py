@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import factorial
+
+import numpy as np
+
+import tableros
+import universos
+
+_pool = None
+_procesos = 0
+CELDAS_POR_TROZO = 1 << 20  # Trabajo de un trozo: unos milisegundos, para respetar el presupuesto
+
+
+def iniciar_pool(procesos=None):
+    """Crea el pool de procesos compartido por todas las partidas.
+
+    Se llama al arrancar, antes de que haya hilos de peticiones: los
+    trabajadores salen de forkserver (o spawn), nunca de un fork de un
+    proceso con hilos. Sin pool, las estrategias puntúan en el propio hilo.
+    """
+    global _pool, _procesos
+    if _pool is None:
+        metodos = multiprocessing.get_all_start_methods()
+        if "forkserver" in metodos:
+            contexto = multiprocessing.get_context("forkserver")
+            contexto.set_forkserver_preload(["estrategias"])
+        else:
+            contexto = multiprocessing.get_context("spawn")
+        _procesos = procesos or os.cpu_count() or 1
+        _pool = ProcessPoolExecutor(max_workers=_procesos, mp_context=contexto)
+    return _pool
+
+
+def particiones(propuestas, candidatos, n):
+    """Para cada propuesta, cuántos candidatos darían 0, 1, ..., n aciertos"""
+    tabla = np.empty((len(propuestas), n + 1), dtype=np.int64)
+    for k, fila in enumerate(propuestas):
+        tabla[k] = np.bincount((candidatos == fila).sum(axis=1), minlength=n + 1)
+    return tabla
+
+
+def puntuar(propuestas, candidatos, n, criterio, tablero=None):
+    """Puntuación de cada propuesta frente a los candidatos; menor es mejor"""
+    if tablero is None:
+        tabla = particiones(propuestas, candidatos, n)
+    else:
+        tabla = tableros.particiones(propuestas, candidatos, *tablero)
+    total = len(candidatos)
+    if criterio == "minimax":
+        # Peor caso de Knuth; a igualdad, menor tamaño esperado del resto
+        return tabla.max(axis=1) + (tabla ** 2).sum(axis=1) / (total * total + 1)
+    probabilidades = tabla / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nansum(probabilidades * np.log2(probabilidades), axis=1)
+
+
+class Estrategia:
+    nombre = None
+
+    def elegir(self, supervivientes, n, tablero=None, propuestas=None):
+        """Devuelve el rango del universo que se propone a continuación.
+
+        Con `tablero` = (colores, posiciones) los universos son códigos de
+        tableros.py y las respuestas, claves de negras y blancas. `propuestas`
+        limita entre qué códigos se elige; por defecto, los supervivientes.
+        """
+        raise NotImplementedError
+
+
+class Aleatoria(Estrategia):
+    nombre = "aleatoria"
+
+    def elegir(self, supervivientes, n, tablero=None, propuestas=None):
+        return random.choice(supervivientes)
+
+
+class Puntuada(Estrategia):
+    """Elige la propuesta con mejor puntuación dentro de un presupuesto de tiempo"""
+
+    criterio = None
+
+    def __init__(self, presupuesto=0.5, max_propuestas=500, max_candidatos=5000,
+                 procesos=None, tam_trozo=50):
+        self.presupuesto = presupuesto  # Segundos por petición; None = sin límite
+        self.max_propuestas = max_propuestas
+        self.max_candidatos = max_candidatos
+        self.procesos = procesos  # None = el pool de iniciar_pool si existe; 0 = sin pool
+        self.tam_trozo = tam_trozo  # Máximo de propuestas por trozo; ver _tam_trozo
+
+    def elegir(self, supervivientes, n, tablero=None, propuestas=None):
+        # Sin respuestas todas las permutaciones son equivalentes por simetría
+        if len(supervivientes) <= 2 or (tablero is None and len(supervivientes) == factorial(n)):
+            return random.choice(supervivientes)
+
+        limite = None if self.presupuesto is None else time.monotonic() + self.presupuesto
+        propuestas = self._muestra(supervivientes if propuestas is None else propuestas,
+                                   self.max_propuestas)
+        candidatos = self._muestra(supervivientes, self.max_candidatos)
+        if tablero is None:
+            filas_propuestas = universos.decodificar(propuestas, n)
+            filas_candidatos = universos.decodificar(candidatos, n)
+        else:
+            # Los códigos se puntúan directamente con la tabla de respuestas
+            filas_propuestas, filas_candidatos = propuestas, candidatos
+        tam = self._tam_trozo(n, len(candidatos), tablero)
+        trozos = [slice(i, i + tam) for i in range(0, len(propuestas), tam)]
+
+        puntos = np.full(len(propuestas), np.inf)
+        if self.procesos == 0 or _pool is None or len(trozos) == 1:
+            for trozo in trozos:
+                if limite is not None and time.monotonic() >= limite:
+                    break
+                puntos[trozo] = puntuar(
+                    filas_propuestas[trozo], filas_candidatos, n, self.criterio, tablero)
+        else:
+            self._puntuar_en_pool(trozos, filas_propuestas, filas_candidatos, n, tablero,
+                                  limite, puntos)
+
+        # Si se agotó el tiempo, la mejor propuesta puntuada hasta ahora
+        if np.isinf(puntos).all():
+            return random.choice(propuestas)
+        return propuestas[int(np.argmin(puntos))]
+
+    def _tam_trozo(self, n, num_candidatos, tablero):
+        """Propuestas por trozo según lo que cuesta puntuar cada una.
+
+        El presupuesto solo se comprueba entre trozos: en un tablero grande,
+        cuya fila de respuestas se calcula al vuelo sobre todos los códigos,
+        una sola propuesta puede costar décimas de segundo.
+        """
+        if tablero is None:
+            coste = num_candidatos * n
+        else:
+            coste = num_candidatos
+            if not tableros.tabla_completa(*tablero):
+                coste += tableros.total(*tablero) * tablero[1]
+        return max(1, min(self.tam_trozo, CELDAS_POR_TROZO // max(coste, 1)))
+
+    def _puntuar_en_pool(self, trozos, filas_propuestas, filas_candidatos, n, tablero,
+                         limite, puntos):
+        """Como mucho un trozo en curso por trabajador, y ninguno nuevo pasado el límite.
+
+        Al agotarse el tiempo se cancelan los trozos que siguen en cola y solo
+        los que ya se están calculando terminan sin que nadie los espere.
+        """
+        siguientes = iter(trozos)
+        en_curso = {}
+        while True:
+            while len(en_curso) < _procesos and (limite is None or time.monotonic() < limite):
+                trozo = next(siguientes, None)
+                if trozo is None:
+                    break
+                en_curso[_pool.submit(puntuar, filas_propuestas[trozo], filas_candidatos,
+                                      n, self.criterio, tablero)] = trozo
+            if not en_curso:
+                return
+            espera = None if limite is None else max(0, limite - time.monotonic())
+            hechas, _ = wait(en_curso, timeout=espera, return_when=FIRST_COMPLETED)
+            if not hechas:
+                for tarea in en_curso:
+                    tarea.cancel()
+                return
+            for tarea in hechas:
+                puntos[en_curso.pop(tarea)] = tarea.result()
+
+    def _muestra(self, rangos, maximo):
+        if len(rangos) <= maximo:
+            return rangos
+        return rangos[np.sort(np.random.choice(len(rangos), maximo, replace=False))]
+
+
+class Minimax(Puntuada):
+    nombre = "minimax"
+    criterio = "minimax"
+
+
+class Entropia(Puntuada):
+    nombre = "entropia"
+    criterio = "entropia"
+
+
+ESTRATEGIAS = {clase.nombre: clase for clase in (Aleatoria, Minimax, Entropia)}
@@ -0,0 +1,734 @@
+"""Partidas de Mastermind: el estado de cada juego y cómo avanza con las respuestas.
+
+No depende de Flask, para que los procesos de simulacion.py puedan crear
+partidas sin importar el servidor.
+"""
+from logic import *
+import copy
+import itertools
+from itertools import combinations
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import aperturas
+import emparejamientos
+import metricas
+import persistencia
+import plantillas
+import tableros
+import universos
+from estrategias import ESTRATEGIAS, Minimax
+
+logger = logging.getLogger("mastermind")
+
+# Hilos compartidos que precalculan la siguiente propuesta mientras el jugador piensa.
+# Usan como mucho la mitad de los núcleos y un cupo de ramas pendientes: con
+# el cupo lleno no se especula, para no quitar tiempo a las peticiones
+especulador = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2),
+                                 thread_name_prefix="especulacion")
+MAX_RAMAS_PENDIENTES = 64
+_cupo_especulacion = threading.BoundedSemaphore(MAX_RAMAS_PENDIENTES)
+
+def _propuestas(filas):
+    """Filas de colores por posición -> ["p0c2", "p1c0", ...], de una en una"""
+    return ([f"p{i}c{color}" for i, color in enumerate(fila)] for fila in filas)
+
+class JuegoMastermind:
+    tipo = "universos"  # Clave de la clase al guardar la partida fuera del proceso
+
+    def __init__(self):
+        self.num_elementos = None
+        self.plantilla = None  # Estado inicial compartido con las partidas del mismo tamaño
+        self.colores = []
+        self.posiciones = []
+        self.symbols = []
+        self.conocimiento = And()
+        self._respuestas_conocidas = 0  # Respuestas ya añadidas a la base de conocimiento
+        self.universos = np.empty(0, dtype=np.uint32)  # Rangos de permutación
+        self.supervivientes = self.universos
+        self.restricciones = []
+        self._instantaneas = []  # Estado previo a cada respuesta, para deshacer
+        self.historial = []
+        self.intentos = 0
+        self.revision = 0  # Cambia con cada cambio del historial; base del ETag de /historial
+        self.auditar = False  # Contrasta el filtrado vectorizado con model_check
+        self.estrategia = Minimax()  # Cómo se elige la propuesta entre los supervivientes
+        self.libro = None  # Aperturas precalculadas para la estrategia y el tamaño
+        self.especular = True  # Precalcula cada posible respuesta tras proponer
+        self._especulacion = None  # (fila propuesta, {aciertos: tarea})
+        self._siguiente = None  # Rango ya calculado para la próxima propuesta
+
+    def configurar_juego(self, num_elementos, estrategia=None):
+        self._descartar_especulacion()
+        if estrategia is not None:
+            self.estrategia = ESTRATEGIAS[estrategia]()
+        self.num_elementos = num_elementos
+        with metricas.cronometrar("plantilla"):
+            self.plantilla = plantillas.obtener(num_elementos)
+        self.colores = self.plantilla.colores
+        self.posiciones = self.plantilla.posiciones
+        self.symbols = self.plantilla.symbols
+        # Solo las respuestas de esta partida se añaden sobre la copia
+        self.conocimiento = self.plantilla.conocimiento.copy()
+        self._respuestas_conocidas = 0
+        self.universos = self.plantilla.universos
+        self.supervivientes = self.universos
+        self.libro = aperturas.cargar(self.estrategia.nombre, num_elementos)
+        self.restricciones = []
+        self._instantaneas = []
+        self.historial = []
+        self.intentos = -1
+        self.revision += 1
+        
+        logger.info("Juego configurado: %d colores, %d universos posibles",
+                    num_elementos, len(self.universos))
+        logger.debug("Colores: %s", self.colores)
+        logger.debug("Posiciones: %s", self.posiciones)
+        if logger.isEnabledFor(logging.DEBUG):
+            self._imprimir_universos()
+        
+        return {"status": "success", "message": f"Juego configurado con {num_elementos} colores"}
+
+    def _imprimir_universos(self):
+        """Registra todos los universos posibles (costoso: solo en nivel DEBUG)"""
+        i = 0
+        for _, filas in universos.bloques(self.universos, self.num_elementos):
+            for fila in filas:
+                i += 1
+                logger.debug("%d. %s", i, self._decodificar(fila))
+        logger.debug("Total: %d universos", len(self.universos))
+
+    def _registrar_supervivientes(self):
+        logger.debug("Universos válidos: %d", len(self.supervivientes))
+        if logger.isEnabledFor(logging.DEBUG) and len(self.supervivientes) <= 10:
+            filas = universos.decodificar(self.supervivientes, self.num_elementos)
+            for i, u in enumerate(filas):
+                logger.debug("%d. %s", i + 1, self._decodificar(u))
+
+    def manejar_respuesta(self, propuesta, aciertos):
+        if aciertos == self.num_elementos:
+            # Asegúrate que esta parte esté EXACTAMENTE así
+            return {
+                "status": "ganado",  # Debe ser "ganado" exactamente
+                "combinacion": propuesta,
+                "mensaje": "¡Combinación correcta encontrada!"
+            }
+
+    def _codificar(self, propuesta):
+        """Convierte ["p0c2", "p1c0", ...] en el vector de colores por posición"""
+        fila = np.empty(self.num_elementos, dtype=np.uint8)
+        for variable in propuesta:
+            posicion, color = variable[1:].split("c")
+            fila[int(posicion)] = int(color)
+        return fila
+
+    def _decodificar(self, fila):
+        """Convierte un vector de colores por posición en ["p0c2", "p1c0", ...]"""
+        return [f"p{i}c{color}" for i, color in enumerate(fila.tolist())]
+
+    def _filtrar_universos(self):
+        # Los supervivientes ya reflejan todas las respuestas recibidas
+        if self.auditar:
+            self._auditar_universos()
+        return self.supervivientes
+
+    def _aplicar_restriccion(self, fila, aciertos):
+        """Filtra solo los supervivientes actuales con la respuesta más reciente"""
+        metricas.modelos_evaluados.incrementar(len(self.supervivientes))
+        with metricas.cronometrar("filtrado"):
+            self.supervivientes = universos.filtrar(
+                self.supervivientes, self.num_elementos, fila, aciertos)
+        metricas.candidatos_restantes.observar(len(self.supervivientes))
+
+    def _auditar_universos(self):
+        """Comprueba con la base de conocimiento que el filtrado coincide"""
+        # Un universo fija todos los símbolos (el resto son falsos por las
+        # restricciones de unicidad), así que basta evaluar la base compilada
+        n = self.num_elementos
+        indices = {simbolo.name: k for k, simbolo in enumerate(self.symbols)}
+        evaluar = self._actualizar_conocimiento().compile(indices)
+        validos = np.isin(self.universos, self.supervivientes)
+        for rangos, filas in universos.bloques(self.universos, n):
+            for rango, fila in zip(rangos, filas):
+                modelo = sum(1 << (i * n + color) for i, color in enumerate(fila.tolist()))
+                if evaluar(modelo) != validos[rango]:
+                    raise AssertionError(
+                        f"Filtrado inconsistente para {self._decodificar(fila)}")
+
+    def generar_propuesta(self):
+        universos_validos = self._filtrar_universos()
+        
+        logger.debug("Intento %d", self.intentos + 1)
+        self._registrar_supervivientes()
+        
+        if not len(universos_validos):
+            logger.info("¡No hay más universos válidos!")
+            return None
+        
+        with metricas.cronometrar("propuesta"):
+            rango, self._siguiente = self._siguiente, None
+            if rango is None:
+                rango = self._elegir_rango(universos_validos, self.restricciones)
+        fila = universos.decodificar([rango], self.num_elementos)[0]
+        propuesta = self._decodificar(fila)
+        self.intentos += 1
+        self.revision += 1
+        self.historial.append({
+            "intento": self.intentos,
+            "propuesta": propuesta.copy(),
+            "universos_restantes": len(universos_validos)
+        })
+        
+        logger.debug("Propuesta generada: %s", propuesta)
+        if self.especular:
+            self._especular(fila)
+        
+        return propuesta
+
+    def _elegir_rango(self, supervivientes, restricciones, estrategia=None):
+        """Propuesta del libro de aperturas o, fuera de él, de la estrategia"""
+        rango = None
+        if self.libro is not None:
+            rango = aperturas.consultar(self.libro, restricciones)
+        if rango is None:
+            rango = (estrategia or self.estrategia).elegir(supervivientes, self.num_elementos)
+        return rango
+
+    def _calcular_rama(self, supervivientes, restricciones, estrategia):
+        """Supervivientes y siguiente propuesta si la última respuesta fuera restricciones[-1]"""
+        with metricas.cronometrar("especulacion"):
+            fila, aciertos = restricciones[-1]
+            resto = universos.filtrar(supervivientes, self.num_elementos, fila, aciertos)
+            rango = self._elegir_rango(resto, restricciones, estrategia) if len(resto) else None
+        return resto, rango
+
+    def _especular(self, fila):
+        """Lanza en segundo plano una rama por cada respuesta posible que no gana"""
+        self._descartar_especulacion()
+        # Las ramas puntúan en su propio hilo: el pool de procesos queda para
+        # las propuestas que alguien está esperando
+        estrategia = copy.copy(self.estrategia)
+        if hasattr(estrategia, "procesos"):
+            estrategia.procesos = 0
+        tareas = {}
+        for aciertos in range(self.num_elementos):
+            if not _cupo_especulacion.acquire(blocking=False):
+                break
+            tarea = especulador.submit(self._calcular_rama, self.supervivientes,
+                                       self.restricciones + [(fila, aciertos)], estrategia)
+            # También se llama al cancelarla, así que el cupo siempre se devuelve
+            tarea.add_done_callback(lambda _: _cupo_especulacion.release())
+            tareas[aciertos] = tarea
+        self._especulacion = (fila, tareas)
+
+    def _usar_especulacion(self, fila, aciertos):
+        """Adopta la rama precalculada si ya terminó; si no, la cancela"""
+        especulacion, self._especulacion = self._especulacion, None
+        if especulacion is None or aciertos == self.num_elementos:
+            self._cancelar(especulacion)
+            return False
+        fila_especulada, tareas = especulacion
+        tarea = tareas.get(aciertos) if np.array_equal(fila_especulada, fila) else None
+        self._cancelar(especulacion)
+        if tarea is None or not tarea.done() or tarea.cancelled() or tarea.exception():
+            metricas.especulaciones.incrementar(valor="fallo")
+            return False
+        self.supervivientes, self._siguiente = tarea.result()
+        metricas.especulaciones.incrementar(valor="acierto")
+        metricas.candidatos_restantes.observar(len(self.supervivientes))
+        return True
+
+    def _descartar_especulacion(self):
+        self._cancelar(self._especulacion)
+        self._especulacion = None
+        self._siguiente = None
+
+    @staticmethod
+    def _cancelar(especulacion):
+        if especulacion is not None:
+            for tarea in especulacion[1].values():
+                tarea.cancel()
+
+    def procesar_respuesta(self, propuesta, aciertos):
+        logger.debug("Respuesta recibida: %d aciertos", aciertos)
+        # Una propuesta precalculada solo vale para la respuesta que la originó
+        self._siguiente = None
+
+        self._instantaneas.append((
+            self.supervivientes,
+            len(self.restricciones),
+            len(self.historial),
+            self.intentos,
+        ))
+        fila = self._codificar(propuesta)
+        self.restricciones.append((fila, aciertos))
+        if not self._usar_especulacion(fila, aciertos):
+            self._aplicar_restriccion(fila, aciertos)
+        
+        if aciertos == self.num_elementos:
+            logger.debug("¡Solución correcta encontrada!")
+            return {"status": "ganado", "combinacion": propuesta}
+
+        if aciertos == 0:
+            return {"status": "continua", "message": f"Descartadas {len(propuesta)} variables"}
+
+        self._registrar_supervivientes()
+        
+        return {"status": "continua", "message": f"Actualizado con {aciertos} aciertos"}
+
+    def _actualizar_conocimiento(self):
+        """Añade a la base de conocimiento las respuestas que aún no tiene.
+
+        Solo la usa la auditoría, así que se completa bajo demanda en vez de
+        construir en cada respuesta una disyunción de C(n, aciertos) términos.
+        """
+        for fila, aciertos in self.restricciones[self._respuestas_conocidas:]:
+            if aciertos != self.num_elementos:
+                self._anadir_conocimiento(self._decodificar(fila), aciertos)
+        self._respuestas_conocidas = len(self.restricciones)
+        return self.conocimiento
+
+    def _anadir_conocimiento(self, propuesta, aciertos):
+        if aciertos == 0:
+            logger.debug("Descartando todas las variables de la propuesta")
+            for simbolo in propuesta:
+                self.conocimiento.add(Not(Symbol(simbolo)))
+            return
+        
+        # Lógica para aciertos parciales
+        logger.debug("Procesando %d aciertos parciales...", aciertos)
+        
+        combinaciones_correctas = list(combinations(propuesta, aciertos))
+        opciones_disjuntas = []
+        
+        for combinacion in combinaciones_correctas:
+            falsas = [v for v in propuesta if v not in combinacion]
+            opciones = [Symbol(v) for v in combinacion] + [Not(Symbol(v)) for v in falsas]
+            opciones_disjuntas.append(And(*opciones))
+        
+        self.conocimiento.add(Or(*opciones_disjuntas))
+
+    def deshacer_respuesta(self):
+        """Retracta la última respuesta restaurando el estado previo, sin refiltrar"""
+        if not self._instantaneas:
+            return {"status": "error", "message": "No hay respuestas que deshacer"}
+
+        (self.supervivientes, restricciones,
+         historial, self.intentos) = self._instantaneas.pop()
+        self._descartar_especulacion()
+        if self.supervivientes is None:
+            # Instantánea de una partida restaurada: solo se guardan las actuales
+            self.supervivientes = self._refiltrar(self.restricciones[:restricciones])
+        del self.restricciones[restricciones:]
+        if self._respuestas_conocidas > restricciones:
+            # Se rehace desde la plantilla la próxima vez que se audite
+            self.conocimiento = self.plantilla.conocimiento.copy()
+            self._respuestas_conocidas = 0
+        del self.historial[historial:]
+        self.revision += 1
+
+        logger.debug("Respuesta deshecha. Universos válidos: %d", len(self.supervivientes))
+
+        return {
+            "status": "success",
+            "propuesta": self.historial[-1]["propuesta"] if self.historial else None,
+            "intento_actual": self.intentos,
+            "universos_restantes": len(self.supervivientes)
+        }
+
+    def memoria(self):
+        """Bytes de los arrays propios: supervivientes e instantáneas, sin la plantilla"""
+        arrays = {id(array): array for array in
+                  [self.supervivientes] + [instantanea[0] for instantanea in self._instantaneas]
+                  if array is not None and array is not self.universos}
+        return sum(array.nbytes for array in arrays.values())
+
+    def iterar_supervivientes(self, desde=0, limite=None):
+        """Universos válidos como propuestas, decodificados por bloques al recorrerlos.
+
+        Solo guarda una referencia a los supervivientes actuales, que nunca
+        se modifican en el sitio, así que se puede consumir fuera del lock.
+        """
+        rangos = self.supervivientes[desde:None if limite is None else desde + limite]
+        filas = (fila for _, bloque in universos.bloques(rangos, self.num_elementos)
+                 for fila in bloque.tolist())
+        return _propuestas(filas)
+
+    def _refiltrar(self, restricciones):
+        supervivientes = self.universos
+        for fila, aciertos in restricciones:
+            supervivientes = universos.filtrar(supervivientes, self.num_elementos, fila, aciertos)
+        return supervivientes
+
+    def exportar(self):
+        """(cabecera, arrays) con el estado mínimo de la partida; ver persistencia.py"""
+        if self.num_elementos is None:
+            return {"n": None}, {}
+        n = self.num_elementos
+        formato, supervivientes = persistencia.subconjunto(self.supervivientes, self.universos)
+        cabecera = {
+            "n": n,
+            "estrategia": self.estrategia.nombre,
+            "intentos": self.intentos,
+            "revision": self.revision,
+            "aciertos": [aciertos for _, aciertos in self.restricciones],
+            "restantes": [entrada["universos_restantes"] for entrada in self.historial],
+            # Sin los supervivientes: deshacer los recalcula si hace falta
+            "instantaneas": [list(instantanea[1:]) for instantanea in self._instantaneas],
+            "supervivientes": formato,
+        }
+        arrays = {
+            "respuestas": np.array([fila for fila, _ in self.restricciones],
+                                   dtype=np.uint8).reshape(-1, n),
+            "propuestas": np.array([self._codificar(entrada["propuesta"]) for entrada in self.historial],
+                                   dtype=np.uint8).reshape(-1, n),
+        }
+        if supervivientes is not None:
+            arrays["supervivientes"] = supervivientes
+        return cabecera, arrays
+
+    @classmethod
+    def importar(cls, cabecera, arrays):
+        """Partida equivalente a la exportada; la base de conocimiento se rehace al auditar"""
+        juego = cls()
+        if cabecera["n"] is None:
+            return juego
+        juego.configurar_juego(cabecera["n"], cabecera["estrategia"])
+        juego.intentos = cabecera["intentos"]
+        juego.revision = cabecera["revision"]
+        juego.historial = [
+            {"intento": k, "propuesta": juego._decodificar(fila), "universos_restantes": restantes}
+            for k, (fila, restantes) in enumerate(zip(arrays["propuestas"], cabecera["restantes"]))
+        ]
+        juego.restricciones = list(zip(arrays["respuestas"], cabecera["aciertos"]))
+        juego._instantaneas = [(None, *instantanea) for instantanea in cabecera["instantaneas"]]
+        juego.supervivientes = persistencia.restaurar_subconjunto(
+            cabecera["supervivientes"], arrays.get("supervivientes"), juego.universos)
+        return juego
+
+class JuegoGrande(JuegoMastermind):
+    """Motor para n grandes: matriz posición × color y propagación por emparejamientos.
+
+    No enumera los n! universos ni construye la base de conocimiento; las
+    propuestas salen de la búsqueda de emparejamientos.py y el número de
+    universos restantes es exacto solo cuando contarlos es barato.
+    """
+
+    tipo = "emparejamientos"
+
+    def __init__(self):
+        super().__init__()
+        self.especular = False
+        self.posibles = []  # Máscara de colores posibles por posición
+
+    def configurar_juego(self, num_elementos, estrategia=None):
+        # Solo hay una forma de elegir: la primera permutación consistente
+        # que encuentra la búsqueda, en orden aleatorio
+        self.num_elementos = num_elementos
+        self.colores = [f"c{i}" for i in range(num_elementos)]
+        self.posiciones = [f"p{i}" for i in range(num_elementos)]
+        self.posibles = [(1 << num_elementos) - 1] * num_elementos
+        self.restricciones = []
+        self._instantaneas = []
+        self.historial = []
+        self.intentos = -1
+        self.revision += 1
+
+        logger.info("Juego configurado: %d colores, motor de emparejamientos", num_elementos)
+        return {"status": "success", "message": f"Juego configurado con {num_elementos} colores"}
+
+    def generar_propuesta(self):
+        logger.debug("Intento %d", self.intentos + 1)
+        with metricas.cronometrar("propuesta"):
+            fila = emparejamientos.buscar(self.posibles, self.restricciones, self.num_elementos)
+        if fila is None:
+            logger.info("¡No hay más universos válidos!")
+            return None
+        with metricas.cronometrar("conteo"):
+            restantes, exacto = emparejamientos.restantes(
+                self.posibles, self.restricciones, self.num_elementos, minimo=1)
+        propuesta = [f"p{i}c{color}" for i, color in enumerate(fila)]
+        self.intentos += 1
+        self.revision += 1
+        self.historial.append({
+            "intento": self.intentos,
+            "propuesta": propuesta.copy(),
+            "universos_restantes": restantes,
+            "exacto": exacto
+        })
+        logger.debug("Propuesta generada: %s (%s%d universos)",
+                     propuesta, "" if exacto else "~", restantes)
+        return propuesta
+
+    def procesar_respuesta(self, propuesta, aciertos):
+        logger.debug("Respuesta recibida: %d aciertos", aciertos)
+        restriccion = (tuple(self._codificar(propuesta).tolist()), aciertos)
+        posibles = None
+        if aciertos != self.num_elementos:
+            # Se propaga antes de guardar nada: si falla, la partida no cambia
+            with metricas.cronometrar("filtrado"):
+                posibles = emparejamientos.propagar(
+                    self.posibles, self.restricciones + [restriccion], self.num_elementos)
+        self._instantaneas.append((self.posibles, len(self.historial), self.intentos))
+        self.restricciones.append(restriccion)
+        if aciertos == self.num_elementos:
+            logger.debug("¡Solución correcta encontrada!")
+            return {"status": "ganado", "combinacion": propuesta}
+
+        # Sin universos consistentes se conserva la matriz: la próxima
+        # propuesta devolverá None igual que con el motor de universos
+        if posibles is not None:
+            self.posibles = posibles
+        return {"status": "continua", "message": f"Actualizado con {aciertos} aciertos"}
+
+    def deshacer_respuesta(self):
+        if not self._instantaneas:
+            return {"status": "error", "message": "No hay respuestas que deshacer"}
+
+        self.posibles, historial, self.intentos = self._instantaneas.pop()
+        self.restricciones.pop()
+        del self.historial[historial:]
+        self.revision += 1
+        ultimo = self.historial[-1] if self.historial else None
+        return {
+            "status": "success",
+            "propuesta": ultimo["propuesta"] if ultimo else None,
+            "intento_actual": self.intentos,
+            "universos_restantes": ultimo["universos_restantes"] if ultimo else None
+        }
+
+
+    def memoria(self):
+        # Solo máscaras por posición: unos pocos enteros por instantánea
+        return 8 * self.num_elementos * (len(self._instantaneas) + 1) if self.num_elementos else 0
+
+    def iterar_supervivientes(self, desde=0, limite=None):
+        """Permutaciones consistentes enumeradas bajo demanda, siempre en el mismo orden"""
+        filas = emparejamientos.enumerar(
+            self.posibles, list(self.restricciones), self.num_elementos)
+        fin = None if limite is None else desde + limite
+        return _propuestas(itertools.islice(filas, desde, fin))
+
+    def exportar(self):
+        if self.num_elementos is None:
+            return {"n": None}, {}
+        n = self.num_elementos
+        cabecera = {
+            "n": n,
+            "intentos": self.intentos,
+            "revision": self.revision,
+            "aciertos": [aciertos for _, aciertos in self.restricciones],
+            "restantes": [entrada["universos_restantes"] for entrada in self.historial],
+            "exactos": [entrada["exacto"] for entrada in self.historial],
+            # Las máscaras pueden pasar de 64 bits: van como enteros de JSON
+            "posibles": self.posibles,
+            "instantaneas": [list(instantanea) for instantanea in self._instantaneas],
+        }
+        arrays = {
+            "respuestas": np.array([fila for fila, _ in self.restricciones],
+                                   dtype=np.uint8).reshape(-1, n),
+            "propuestas": np.array([self._codificar(entrada["propuesta"]) for entrada in self.historial],
+                                   dtype=np.uint8).reshape(-1, n),
+        }
+        return cabecera, arrays
+
+    @classmethod
+    def importar(cls, cabecera, arrays):
+        juego = cls()
+        if cabecera["n"] is None:
+            return juego
+        juego.configurar_juego(cabecera["n"])
+        juego.intentos = cabecera["intentos"]
+        juego.revision = cabecera["revision"]
+        juego.historial = [
+            {"intento": k, "propuesta": juego._decodificar(fila),
+             "universos_restantes": restantes, "exacto": exacto}
+            for k, (fila, restantes, exacto) in enumerate(
+                zip(arrays["propuestas"], cabecera["restantes"], cabecera["exactos"]))
+        ]
+        juego.restricciones = [(tuple(fila.tolist()), aciertos)
+                               for fila, aciertos in zip(arrays["respuestas"], cabecera["aciertos"])]
+        juego.posibles = cabecera["posibles"]
+        juego._instantaneas = [tuple(instantanea) for instantanea in cabecera["instantaneas"]]
+        return juego
+
+
+class JuegoGeneralizado:
+    """Variante con colores y posiciones independientes, repetición y fichas negras/blancas.
+
+    No usa base de conocimiento: los supervivientes se filtran consultando la
+    tabla de respuestas de tableros.py.
+    """
+
+    tipo = "generalizado"
+
+    def __init__(self):
+        self.num_colores = None
+        self.num_posiciones = None
+        self.repeticion = True
+        self.universos = np.empty(0, dtype=np.uint32)  # Códigos en base num_colores
+        self.supervivientes = self.universos
+        self.restricciones = []  # (código propuesto, clave de respuesta)
+        self._instantaneas = []
+        self.historial = []
+        self.intentos = 0
+        self.revision = 0
+        self.estrategia = Minimax()
+
+    def configurar_juego(self, colores, posiciones, estrategia=None, repeticion=True):
+        if estrategia is not None:
+            self.estrategia = ESTRATEGIAS[estrategia]()
+        self.num_colores = colores
+        self.num_posiciones = posiciones
+        self.repeticion = repeticion
+        with metricas.cronometrar("universos"):
+            self.universos = tableros.todos_los_codigos(colores, posiciones, repeticion)
+        self.supervivientes = self.universos
+        self.restricciones = []
+        self._instantaneas = []
+        self.historial = []
+        self.intentos = -1
+        self.revision += 1
+
+        logger.info("Juego configurado: %d colores, %d posiciones, %d universos posibles",
+                    colores, posiciones, len(self.universos))
+
+        return {"status": "success",
+                "message": f"Juego configurado con {colores} colores y {posiciones} posiciones"}
+
+    def _codificar(self, propuesta):
+        """Convierte ["p0c2", "p1c2", ...] en el código del tablero"""
+        fila = [0] * self.num_posiciones
+        for variable in propuesta:
+            posicion, color = variable[1:].split("c")
+            fila[int(posicion)] = int(color)
+        return tableros.codigo(fila, self.num_colores)
+
+    def _decodificar(self, codigo):
+        fila = tableros.decodificar([codigo], self.num_colores, self.num_posiciones)[0]
+        return [f"p{i}c{color}" for i, color in enumerate(fila.tolist())]
+
+    def generar_propuesta(self):
+        logger.debug("Intento %d", self.intentos + 1)
+        metricas.candidatos_restantes.observar(len(self.supervivientes))
+        if not len(self.supervivientes):
+            logger.info("¡No hay más universos válidos!")
+            return None
+
+        tablero = (self.num_colores, self.num_posiciones)
+        with metricas.cronometrar("propuesta"):
+            propuestas = None
+            if not self.restricciones:
+                # Antes de responder basta un código por reparto de repeticiones
+                propuestas = np.intersect1d(tableros.representantes(*tablero), self.universos)
+            codigo = self.estrategia.elegir(self.supervivientes, self.num_posiciones,
+                                            tablero, propuestas)
+        propuesta = self._decodificar(codigo)
+        self.intentos += 1
+        self.revision += 1
+        self.historial.append({
+            "intento": self.intentos,
+            "propuesta": propuesta.copy(),
+            "universos_restantes": len(self.supervivientes)
+        })
+        logger.debug("Propuesta generada: %s", propuesta)
+        return propuesta
+
+    def procesar_respuesta(self, propuesta, negras, blancas=0):
+        logger.debug("Respuesta recibida: %d negras, %d blancas", negras, blancas)
+        self._instantaneas.append((self.supervivientes, len(self.historial), self.intentos))
+        codigo = self._codificar(propuesta)
+        respuesta = tableros.clave(negras, blancas, self.num_posiciones)
+        self.restricciones.append((codigo, respuesta))
+        metricas.modelos_evaluados.incrementar(len(self.supervivientes))
+        with metricas.cronometrar("filtrado"):
+            self.supervivientes = tableros.filtrar(
+                self.supervivientes, self.num_colores, self.num_posiciones, codigo, respuesta)
+
+        if negras == self.num_posiciones:
+            logger.debug("¡Solución correcta encontrada!")
+            return {"status": "ganado", "combinacion": propuesta}
+        return {"status": "continua",
+                "message": f"Actualizado con {negras} negras y {blancas} blancas"}
+
+    def deshacer_respuesta(self):
+        if not self._instantaneas:
+            return {"status": "error", "message": "No hay respuestas que deshacer"}
+
+        self.supervivientes, historial, self.intentos = self._instantaneas.pop()
+        self.restricciones.pop()
+        if self.supervivientes is None:
+            # Instantánea de una partida restaurada: se recalcula desde el principio
+            self.supervivientes = self.universos
+            for codigo, respuesta in self.restricciones:
+                self.supervivientes = tableros.filtrar(
+                    self.supervivientes, self.num_colores, self.num_posiciones, codigo, respuesta)
+        del self.historial[historial:]
+        self.revision += 1
+        return {
+            "status": "success",
+            "propuesta": self.historial[-1]["propuesta"] if self.historial else None,
+            "intento_actual": self.intentos,
+            "universos_restantes": len(self.supervivientes)
+        }
+
+    def memoria(self):
+        """Como en JuegoMastermind, pero el espacio de códigos es propio de la partida"""
+        arrays = {id(array): array for array in
+                  [self.universos, self.supervivientes]
+                  + [instantanea[0] for instantanea in self._instantaneas]
+                  if array is not None}
+        return sum(array.nbytes for array in arrays.values())
+
+    def iterar_supervivientes(self, desde=0, limite=None):
+        codigos = self.supervivientes[desde:None if limite is None else desde + limite]
+        c, p = self.num_colores, self.num_posiciones
+        filas = (fila for inicio in range(0, len(codigos), universos.TAM_BLOQUE)
+                 for fila in tableros.decodificar(
+                     codigos[inicio:inicio + universos.TAM_BLOQUE], c, p).tolist())
+        return _propuestas(filas)
+
+    def exportar(self):
+        if self.num_colores is None:
+            return {"colores": None}, {}
+        formato, supervivientes = persistencia.subconjunto(self.supervivientes, self.universos)
+        cabecera = {
+            "colores": self.num_colores,
+            "posiciones": self.num_posiciones,
+            "repeticion": self.repeticion,
+            "estrategia": self.estrategia.nombre,
+            "intentos": self.intentos,
+            "revision": self.revision,
+            "restricciones": [[int(codigo), int(respuesta)] for codigo, respuesta in self.restricciones],
+            "propuestas": [self._codificar(entrada["propuesta"]) for entrada in self.historial],
+            "restantes": [entrada["universos_restantes"] for entrada in self.historial],
+            "instantaneas": [list(instantanea[1:]) for instantanea in self._instantaneas],
+            "supervivientes": formato,
+        }
+        arrays = {} if supervivientes is None else {"supervivientes": supervivientes}
+        return cabecera, arrays
+
+    @classmethod
+    def importar(cls, cabecera, arrays):
+        juego = cls()
+        if cabecera["colores"] is None:
+            return juego
+        juego.configurar_juego(cabecera["colores"], cabecera["posiciones"],
+                               cabecera["estrategia"], cabecera["repeticion"])
+        juego.intentos = cabecera["intentos"]
+        juego.revision = cabecera["revision"]
+        juego.historial = [
+            {"intento": k, "propuesta": juego._decodificar(codigo), "universos_restantes": restantes}
+            for k, (codigo, restantes) in enumerate(zip(cabecera["propuestas"], cabecera["restantes"]))
+        ]
+        juego.restricciones = [tuple(restriccion) for restriccion in cabecera["restricciones"]]
+        juego._instantaneas = [(None, *instantanea) for instantanea in cabecera["instantaneas"]]
+        juego.supervivientes = persistencia.restaurar_subconjunto(
+            cabecera["supervivientes"], arrays.get("supervivientes"), juego.universos)
+        return juego
+
+TIPOS_JUEGO = {clase.tipo: clase for clase in (JuegoMastermind, JuegoGrande, JuegoGeneralizado)}
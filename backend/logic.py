@@ -1,7 +1,14 @@
+import heapq
 import itertools
+import weakref
+
+
+class EvaluationException(Exception):
+    pass
 
 
 class Sentence():
+    __slots__ = ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +20,75 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return frozenset()
+
+    def compile(self, indices=None):
+        """Compiles the sentence into a function of an integer model.
+
+        `indices` maps each symbol name to a bit position, and bit i of the
+        model is the truth value of that symbol. By default symbols are
+        numbered in sorted order; the mapping is kept as `.indices`.
+        """
+        if indices is None:
+            indices = {name: i for i, name in enumerate(sorted(self.symbols()))}
+        evaluator = eval(f"lambda m: bool({self.expression(indices)})", {})
+        evaluator.indices = indices
+        return evaluator
+
+    def expression(self, indices):
+        """Returns Python source evaluating the sentence over integer model m."""
+        raise Exception("nothing to evaluate")
+
+    @classmethod
+    def bit(cls, name, indices):
+        try:
+            return 1 << indices[name]
+        except KeyError:
+            raise EvaluationException(f"variable {name} not in model")
+
+    @classmethod
+    def literal_masks(cls, sentences, indices):
+        """Splits sentences into masks of positive and negated symbols."""
+        positive, negative, rest = 0, 0, []
+        for sentence in sentences:
+            if isinstance(sentence, Symbol):
+                positive |= cls.bit(sentence.name, indices)
+            elif (isinstance(sentence, Not)
+                  and isinstance(sentence.operand, Symbol)):
+                negative |= cls.bit(sentence.operand.name, indices)
+            else:
+                rest.append(sentence.expression(indices))
+        return positive, negative, rest
+
+    def simplify(self):
+        """Returns an equivalent sentence without trivial structure.
+
+        Double negations are removed, implications become disjunctions,
+        single-child connectives are unwrapped and tautological clauses
+        (a literal together with its negation) are dropped from conjunctions.
+        """
+        return self
+
+    @classmethod
+    def is_literal(cls, sentence):
+        return isinstance(sentence, Symbol) or (
+            isinstance(sentence, Not) and isinstance(sentence.operand, Symbol))
+
+    @classmethod
+    def literal_key(cls, literal):
+        if isinstance(literal, Not):
+            return (literal.operand.name, True)
+        return (literal.name, False)
+
+    @classmethod
+    def tautology(cls, sentence):
+        """Checks if a disjunction contains a literal and its negation."""
+        if not isinstance(sentence, Or):
+            return False
+        literals = {Sentence.literal_key(d) for d in sentence.disjuncts
+                    if Sentence.is_literal(d)}
+        return any((name, True) in literals for name, negated in literals
+                   if not negated)
 
     @classmethod
     def validate(cls, sentence):
@@ -42,16 +117,79 @@ class Sentence():
             return f"({s})"
 
 
-class Symbol(Sentence):
+class InternedSentence(Sentence):
+    """Immutable sentence; structurally equal instances are the same object.
 
-    def __init__(self, name):
-        self.name = name
+    Constructor arguments are normalized by `arguments` and used as the key of
+    a weak intern table, so repeated formulas share one node and a cached hash.
+    """
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+    _table = weakref.WeakValueDictionary()
+
+    def __new__(cls, *args):
+        values = cls.arguments(*args)
+        key = (cls,) + values
+        node = InternedSentence._table.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for field, value in zip(cls.__slots__, values):
+                object.__setattr__(node, field, value)
+            object.__setattr__(node, "_hash", hash(key))
+            object.__setattr__(node, "_symbols", None)
+            InternedSentence._table[key] = node
+        return node
+
+    @classmethod
+    def arguments(cls, *args):
+        """Validates constructor arguments and returns the field values."""
+        return tuple(InternedSentence.child(arg) for arg in args)
+
+    @staticmethod
+    def child(sentence):
+        """Validates a subsentence and returns the value to store for it.
+
+        A conjunction is replaced by a frozen copy: adding to the caller's
+        `And` later must not change the hash of an interned parent.
+        """
+        Sentence.validate(sentence)
+        if isinstance(sentence, And):
+            return sentence.frozen()
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
+
+    def symbols(self):
+        if self._symbols is None:
+            object.__setattr__(self, "_symbols", self.collect_symbols())
+        return self._symbols
+
+    def collect_symbols(self):
+        return frozenset()
+
+
+class Symbol(InternedSentence):
+    __slots__ = ("name",)
+
+    @classmethod
+    def arguments(cls, name):
+        return (name,)
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name)
+
+    __hash__ = InternedSentence.__hash__
+
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,20 +203,24 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def collect_symbols(self):
+        return frozenset((self.name,))
 
+    def expression(self, indices):
+        return f"(m & {Sentence.bit(self.name, indices)})"
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+
+class Not(InternedSentence):
+    __slots__ = ("operand",)
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = InternedSentence.__hash__
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +231,53 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
+    def collect_symbols(self):
         return self.operand.symbols()
 
+    def expression(self, indices):
+        return f"(not {self.operand.expression(indices)})"
+
+    def simplify(self):
+        operand = self.operand.simplify()
+        if isinstance(operand, Not):
+            return operand.operand
+        return Not(operand)
+
 
 class And(Sentence):
+    """Conjunction that can grow with `add`, which is why it is not interned.
+
+    Nested conjunctions are flattened and repeated conjuncts are dropped.
+    Interned sentences hold a frozen copy of their conjunction children.
+    """
+
+    __slots__ = ("conjuncts", "_members", "_hash", "_symbols", "_cnf", "_shared",
+                 "_frozen")
+
     def __init__(self, *conjuncts):
+        self.conjuncts = []
+        self._members = None
+        self._hash = None
+        self._symbols = None
+        self._cnf = None
+        self._shared = False
+        self._frozen = False
         for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+            self.add(conjunct)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None:
+            self._hash = hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
+        return self._hash
+
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,9 +285,77 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def copy(self):
+        """Conjunction with the same conjuncts, copied lazily.
+
+        Both objects share the conjunct list until either of them is
+        modified, so copying a large base knowledge is O(1).
+        """
+        other = And()
+        other.conjuncts = self.conjuncts
+        other._members = self._members
+        other._hash = self._hash
+        other._symbols = self._symbols
+        other._shared = self._shared = True
+        return other
+
+    def frozen(self):
+        """Copy of the conjunction that rejects `add` and `truncate`."""
+        if self._frozen:
+            return self
+        other = self.copy()
+        other._frozen = True
+        return other
+
+    def _check_mutable(self):
+        if self._frozen:
+            raise AttributeError("sentences are immutable")
+
+    def _unshare(self):
+        if self._shared:
+            self.conjuncts = list(self.conjuncts)
+            if self._members is not None:
+                self._members = set(self._members)
+            self._shared = False
+
     def add(self, conjunct):
+        self._check_mutable()
         Sentence.validate(conjunct)
+        if isinstance(conjunct, And):
+            for nested in list(conjunct.conjuncts):
+                self.add(nested)
+            return
+
+        # Small conjunctions are scanned; large ones keep a membership set
+        if self._members is None:
+            if conjunct in self.conjuncts:
+                return
+            if len(self.conjuncts) >= 8:
+                self._unshare()
+                self._members = set(self.conjuncts)
+        elif conjunct in self._members:
+            return
+        self._unshare()
+        if self._members is not None:
+            self._members.add(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        self._symbols = None
+
+    def truncate(self, size):
+        """Keeps only the first `size` conjuncts."""
+        self._check_mutable()
+        if size >= len(self.conjuncts):
+            return
+        self._unshare()
+        del self.conjuncts[size:]
+        if self._members is not None:
+            self._members = set(self.conjuncts)
+        self._hash = None
+        self._symbols = None
+        # Interned conjuncts can be re-added as the very same objects, so the
+        # cached encoding cannot tell a truncated base from an unchanged one
+        self._cnf = None
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -127,22 +367,52 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is None:
+            self._symbols = frozenset().union(
+                *[conjunct.symbols() for conjunct in self.conjuncts])
+        return self._symbols
+
+    def expression(self, indices):
+        positive, negative, terms = Sentence.literal_masks(
+            self.conjuncts, indices)
+        if negative:
+            terms.insert(0, f"not (m & {negative})")
+        if positive:
+            terms.insert(0, f"(m & {positive}) == {positive}")
+        return "(" + " and ".join(terms) + ")" if terms else "True"
+
+    def simplify(self):
+        simplified = And()
+        for conjunct in self.conjuncts:
+            conjunct = conjunct.simplify()
+            if not Sentence.tautology(conjunct):
+                simplified.add(conjunct)
+        if len(simplified.conjuncts) == 1:
+            return simplified.conjuncts[0]
+        return simplified
+
+
+class Or(InternedSentence):
+    __slots__ = ("disjuncts",)
 
-
-class Or(Sentence):
-    def __init__(self, *disjuncts):
+    @classmethod
+    def arguments(cls, *disjuncts):
+        flattened = []
         for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+            if isinstance(disjunct, Or):
+                flattened.extend(disjunct.disjuncts)
+            else:
+                flattened.append(InternedSentence.child(disjunct))
+        return (tuple(dict.fromkeys(flattened)),)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    __hash__ = InternedSentence.__hash__
+
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +427,46 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def collect_symbols(self):
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts])
+
+    def expression(self, indices):
+        positive, negative, terms = Sentence.literal_masks(
+            self.disjuncts, indices)
+        if negative:
+            terms.insert(0, f"(m & {negative}) != {negative}")
+        if positive:
+            terms.insert(0, f"(m & {positive})")
+        return "(" + " or ".join(terms) + ")" if terms else "False"
 
+    def simplify(self):
+        disjuncts = Or(*[disjunct.simplify() for disjunct in self.disjuncts])
+        if len(disjuncts.disjuncts) == 1:
+            return disjuncts.disjuncts[0]
 
-class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        # Literals first in a canonical order, so that equivalent clauses
+        # written in a different order intern to the same node
+        literals = sorted(
+            [d for d in disjuncts.disjuncts if Sentence.is_literal(d)],
+            key=Sentence.literal_key)
+        others = [d for d in disjuncts.disjuncts if not Sentence.is_literal(d)]
+        return Or(*literals, *others)
+
+
+class Implication(InternedSentence):
+    __slots__ = ("antecedent", "consequent")
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = InternedSentence.__hash__
+
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +480,31 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def collect_symbols(self):
+        return self.antecedent.symbols() | self.consequent.symbols()
 
+    def expression(self, indices):
+        antecedent = self.antecedent.expression(indices)
+        consequent = self.consequent.expression(indices)
+        return f"(not {antecedent} or {consequent})"
 
-class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
+    def simplify(self):
+        return Or(Not(self.antecedent), self.consequent).simplify()
+
+
+class Biconditional(InternedSentence):
+    __slots__ = ("left", "right")
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self.left == other.left
+            and self.right == other.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = InternedSentence.__hash__
+
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,43 +520,396 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    def collect_symbols(self):
+        return self.left.symbols() | self.right.symbols()
+
+    def expression(self, indices):
+        left = self.left.expression(indices)
+        right = self.right.expression(indices)
+        return f"((not {left}) == (not {right}))"
+
+    def simplify(self):
+        return Biconditional(self.left.simplify(), self.right.simplify())
+
+
+class SATSolver():
+    """Incremental CDCL satisfiability solver over integer literals.
+
+    A variable is a positive integer and its negation is the negative integer,
+    as in DIMACS. Clauses are watched by two literals, conflicts are resolved
+    with first-UIP clause learning, and branching follows variable activity
+    with saved phases. Clauses may be added between calls to `solve`; learned
+    clauses are kept so later queries against the same clauses get cheaper.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.ok = True
+        self.model = None
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.watches = [[], []]
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.order = []
+        self.var_inc = 1.0
+
+    def new_var(self):
+        """Allocates a fresh variable and returns it."""
+        self.num_vars += 1
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches.extend(([], []))
+        heapq.heappush(self.order, (0.0, self.num_vars))
+        return self.num_vars
+
+    def add_clause(self, literals):
+        """Adds a clause; returns False once the clauses are unsatisfiable."""
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        clause = []
+        for literal in literals:
+            value = self._value(literal)
+            if value == 1 or -literal in clause:
+                return True
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
         else:
+            self._watch(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses and assumptions are satisfiable."""
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        conflicts = 0
+        restart_limit = 100
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+
+                # A conflict without decisions means no model exists at all
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self._analyze(conflict)
+                self._cancel_until(level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._watch(learnt)
+                    self._enqueue(learnt[0], learnt)
+                self.var_inc /= 0.95
+                conflicts += 1
+                continue
+
+            if conflicts >= restart_limit:
+                conflicts = 0
+                restart_limit += restart_limit // 2
+                self._cancel_until(0)
+                continue
+
+            # Assumptions are decided first, one decision level each
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                decision = assumptions[level]
+                value = self._value(decision)
+                if value == -1:
+                    self._cancel_until(0)
+                    return False
+                if value == 1:
+                    self.trail_lim.append(len(self.trail))
+                    continue
+            else:
+                decision = self._pick_branch()
+                if not decision:
+                    self.model = [value == 1 for value in self.values]
+                    self._cancel_until(0)
+                    return True
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(decision, None)
+
+    def _value(self, literal):
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    @staticmethod
+    def _index(literal):
+        return literal * 2 if literal > 0 else 1 - literal * 2
+
+    def _watch(self, clause):
+        self.watches[self._index(clause[0])].append(clause)
+        self.watches[self._index(clause[1])].append(clause)
+
+    def _enqueue(self, literal, reason):
+        var = abs(literal)
+        self.values[var] = 1 if literal > 0 else -1
+        self.levels[var] = len(self.trail_lim)
+        self.reasons[var] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """Runs unit propagation; returns a conflicting clause or None."""
+        values = self.values
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_literal = -trail[self.qhead]
+            self.qhead += 1
+            index = self._index(false_literal)
+            watching = watches[index]
+            watches[index] = kept = []
+            for position, clause in enumerate(watching):
+
+                # Keep the literal that just became false in the second slot
+                if clause[0] == false_literal:
+                    clause[0] = clause[1]
+                    clause[1] = false_literal
+                first = clause[0]
+                first_value = values[abs(first)]
+                if first < 0:
+                    first_value = -first_value
+                if first_value == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if literal < 0:
+                        value = -value
+                    if value != -1:
+                        clause[1] = literal
+                        clause[k] = false_literal
+                        watches[self._index(literal)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if first_value == -1:
+                        kept.extend(watching[position + 1:])
+                        self.qhead = len(trail)
+                        return clause
+                    self._enqueue(first, clause)
+        return None
+
+    def _analyze(self, conflict):
+        """Derives a first-UIP clause; returns it and the backjump level."""
+        levels = self.levels
+        trail = self.trail
+        level = len(self.trail_lim)
+        learnt = [0]
+        seen = set()
+        counter = 0
+        literal = None
+        index = len(trail) - 1
+        clause = conflict
+        while True:
+            for k in range(0 if literal is None else 1, len(clause)):
+                var = abs(clause[k])
+                if var not in seen and levels[var] > 0:
+                    seen.add(var)
+                    self._bump(var)
+                    if levels[var] >= level:
+                        counter += 1
+                    else:
+                        learnt.append(clause[k])
+            while abs(trail[index]) not in seen:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        highest = max(range(1, len(learnt)), key=lambda k: levels[abs(learnt[k])])
+        learnt[1], learnt[highest] = learnt[highest], learnt[1]
+        return learnt, levels[abs(learnt[1])]
+
+    def _bump(self, var):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.var_inc *= 1e-100
+            self._rebuild_order()
+
+    def _rebuild_order(self):
+        self.order = [(-self.activity[var], var)
+                      for var in range(1, self.num_vars + 1)
+                      if self.values[var] == 0]
+        heapq.heapify(self.order)
+
+    def _pick_branch(self):
+        while self.order:
+            activity, var = heapq.heappop(self.order)
+            if self.values[var] == 0 and -activity == self.activity[var]:
+                return var if self.phase[var] else -var
+        return 0
+
+    def _cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.phase[var] = literal > 0
+            self.values[var] = 0
+            self.reasons[var] = None
+            heapq.heappush(self.order, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+        # Stale heap entries pile up across many short solves
+        if len(self.order) > 4 * self.num_vars + 64:
+            self._rebuild_order()
+
+
+class CNFEncoder():
+    """Compiles sentences into clauses of a SATSolver.
+
+    Top-level conjunctions, disjunctions and implications become clauses
+    directly; nested connectives get a fresh variable defined by the Tseitin
+    transformation, shared between structurally equal subformulas.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver if solver is not None else SATSolver()
+        self.variables = dict()
+        self.definitions = dict()
+
+    def variable(self, name):
+        """Returns the solver variable of a symbol name."""
+        var = self.variables.get(name)
+        if var is None:
+            var = self.variables[name] = self.solver.new_var()
+        return var
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, defining it if needed."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        literal = self.definitions.get(sentence)
+        if literal is not None:
+            return literal
+
+        add = self.solver.add_clause
+        if isinstance(sentence, And):
+            children = [self.literal(c) for c in sentence.conjuncts]
+            literal = self.solver.new_var()
+            for child in children:
+                add([-literal, child])
+            add([literal] + [-child for child in children])
+        elif isinstance(sentence, (Or, Implication)):
+            if isinstance(sentence, Or):
+                children = [self.literal(d) for d in sentence.disjuncts]
+            else:
+                children = [-self.literal(sentence.antecedent),
+                            self.literal(sentence.consequent)]
+            literal = self.solver.new_var()
+            for child in children:
+                add([literal, -child])
+            add([-literal] + children)
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.solver.new_var()
+            add([-literal, -left, right])
+            add([-literal, left, -right])
+            add([literal, left, right])
+            add([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+        self.definitions[sentence] = literal
+        return literal
+
+    def add(self, sentence):
+        """Asserts that sentence holds in every model of the solver."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
+        elif isinstance(sentence, Not) and isinstance(sentence.operand, And):
+            self.solver.add_clause(
+                [-self.literal(c) for c in sentence.operand.conjuncts])
+        else:
+            for literal in self.assumptions(sentence):
+                self.solver.add_clause([literal])
+
+    def assumptions(self, sentence):
+        """Returns literals whose conjunction is equivalent to sentence."""
+        if isinstance(sentence, And):
+            return [literal for conjunct in sentence.conjuncts
+                    for literal in self.assumptions(conjunct)]
+        if isinstance(sentence, Not):
+            operand = sentence.operand
+            if isinstance(operand, Not):
+                return self.assumptions(operand.operand)
+            if isinstance(operand, Or):
+                return [literal for disjunct in operand.disjuncts
+                        for literal in self.assumptions(Not(disjunct))]
+            if isinstance(operand, Implication):
+                return (self.assumptions(operand.antecedent)
+                        + self.assumptions(Not(operand.consequent)))
+        return [self.literal(sentence)]
+
+
+def _compile(knowledge):
+    """Returns the CNFEncoder of a knowledge base, encoding only new conjuncts.
+
+    The encoding of a conjunction is cached on it. A conjunction that only
+    grew through `And.add` is extended in place; any other change rebuilds
+    it; `And.truncate` drops the cache. Other sentences are immutable and
+    cheap to encode from scratch.
+    """
+    if not isinstance(knowledge, And):
+        encoder = CNFEncoder()
+        encoder.add(knowledge)
+        return encoder
+
+    encoder = knowledge._cnf
+    conjuncts = knowledge.conjuncts
+    if (encoder is None or encoder.encoded > len(conjuncts)
+            or (encoder.encoded
+                and conjuncts[encoder.encoded - 1] is not encoder.last)):
+        encoder = knowledge._cnf = CNFEncoder()
+        encoder.encoded = 0
+    for conjunct in conjuncts[encoder.encoded:]:
+        encoder.add(conjunct)
+    encoder.encoded = len(conjuncts)
+    encoder.last = conjuncts[-1] if conjuncts else None
+    return encoder
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # Knowledge entails query exactly when knowledge ∧ ¬query has no model
+    encoder = _compile(knowledge)
+    return not encoder.solver.solve(encoder.assumptions(Not(query)))
@@ -0,0 +1,123 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _etiquetas(nombre, valor, extra=None):
+    pares = [] if nombre is None else [f'{nombre}="{valor}"']
+    if extra is not None:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    def __init__(self, nombre, ayuda, etiqueta=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiqueta = etiqueta
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad=1, valor=None):
+        with self._lock:
+            self._valores[valor] = self._valores.get(valor, 0) + cantidad
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for valor, total in sorted(self._valores.items(), key=lambda par: str(par[0])):
+                lineas.append(f"{self.nombre}{_etiquetas(self.etiqueta, valor)} {total}")
+        return lineas
+
+
+class Medidor:
+    """Valor instantáneo leído al exportar"""
+
+    def __init__(self, nombre, ayuda, lectura):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.lectura = lectura
+
+    def exportar(self):
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge",
+                f"{self.nombre} {self.lectura()}"]
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, limites, etiqueta=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = tuple(limites)
+        self.etiqueta = etiqueta
+        self._series = {}  # valor de etiqueta -> [cubetas..., suma, cuenta]
+        self._lock = threading.Lock()
+
+    def observar(self, cantidad, valor=None):
+        with self._lock:
+            serie = self._series.get(valor)
+            if serie is None:
+                serie = self._series[valor] = [0] * len(self.limites) + [0.0, 0]
+            for k, limite in enumerate(self.limites):
+                if cantidad <= limite:
+                    serie[k] += 1
+            serie[-2] += cantidad
+            serie[-1] += 1
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for valor, serie in sorted(self._series.items(), key=lambda par: str(par[0])):
+                for limite, cuenta in zip(self.limites, serie):
+                    etiquetas = _etiquetas(self.etiqueta, valor, f'le="{limite:g}"')
+                    lineas.append(f"{self.nombre}_bucket{etiquetas} {cuenta}")
+                etiquetas = _etiquetas(self.etiqueta, valor, 'le="+Inf"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {serie[-1]}")
+                etiquetas = _etiquetas(self.etiqueta, valor)
+                lineas.append(f"{self.nombre}_sum{etiquetas} {serie[-2]}")
+                lineas.append(f"{self.nombre}_count{etiquetas} {serie[-1]}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self.metricas = []
+
+    def registrar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lineas = []
+        for metrica in self.metricas:
+            lineas.extend(metrica.exportar())
+        return "\n".join(lineas) + "\n"
+
+
+LIMITES_SEGUNDOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+registro = Registro()
+fases = registro.registrar(Histograma(
+    "mastermind_fase_segundos", "Duración de cada fase del juego",
+    LIMITES_SEGUNDOS, etiqueta="fase"))
+peticiones = registro.registrar(Histograma(
+    "mastermind_peticion_segundos", "Duración de cada petición HTTP por ruta",
+    LIMITES_SEGUNDOS, etiqueta="ruta"))
+modelos_evaluados = registro.registrar(Contador(
+    "mastermind_modelos_evaluados_total", "Universos comprobados contra una respuesta"))
+especulaciones = registro.registrar(Contador(
+    "mastermind_especulaciones_total", "Respuestas con la rama precalculada lista o no",
+    etiqueta="resultado"))
+candidatos_restantes = registro.registrar(Histograma(
+    "mastermind_candidatos_restantes", "Universos válidos tras aplicar cada respuesta",
+    (0, 1, 10, 100, 1000, 10000, 100000, 1000000)))
+
+
+@contextmanager
+def cronometrar(fase):
+    """Añade la duración del bloque al histograma de fases"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases.observar(time.perf_counter() - inicio, fase)
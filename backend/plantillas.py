@@ -0,0 +1,81 @@
+"""Estado inicial compartido por todas las partidas de un mismo tamaño.
+
+La base de conocimiento de unicidad, los símbolos y el espacio de universos
+solo dependen de n, así que se construyen una vez por proceso y las partidas
+guardan una referencia: el conocimiento se copia de forma perezosa
+(And.copy) y los universos son un array de solo lectura que el filtrado
+nunca modifica, porque siempre crea arrays nuevos.
+"""
+import threading
+
+import universos
+from logic import And, Implication, Not, Or, Symbol
+
+_plantillas = {}
+_lock = threading.Lock()
+
+
+class Plantilla:
+    __slots__ = ("n", "colores", "posiciones", "symbols", "conocimiento", "universos")
+
+    def __init__(self, n):
+        self.n = n
+        self.colores = tuple(f"c{i}" for i in range(n))
+        self.posiciones = tuple(f"p{i}" for i in range(n))
+        self.symbols = tuple(Symbol(f"p{i}c{j}") for i in range(n) for j in range(n))
+        self.conocimiento = self._conocimiento_inicial()
+        # Cada universo es el rango lexicográfico de su permutación de colores;
+        # las filas solo se decodifican por bloques al filtrar o al responder
+        self.universos = universos.todos_los_rangos(n)
+        self.universos.flags.writeable = False
+
+    def _conocimiento_inicial(self):
+        conocimiento = And()
+
+        # Cada color aparece exactamente una vez
+        for colo in self.colores:
+            conocimiento.add(Or(*[Symbol(f"p{i}{colo}") for i in range(self.n)]))
+
+        # Restricciones de unicidad
+        for colo in self.colores:
+            for i in range(self.n):
+                for j in range(self.n):
+                    if i != j:
+                        conocimiento.add(
+                            Implication(Symbol(f"p{i}{colo}"), Not(Symbol(f"p{j}{colo}"))))
+
+        for i in range(self.n):
+            for colo in self.colores:
+                for colo2 in self.colores:
+                    if colo != colo2:
+                        conocimiento.add(
+                            Implication(Symbol(f"p{i}{colo}"), Not(Symbol(f"p{i}{colo2}"))))
+
+        # p ⇒ ¬q y q ⇒ ¬p quedan como la misma cláusula ¬p ∨ ¬q, que se guarda una vez
+        conocimiento = conocimiento.simplify()
+        return conocimiento if isinstance(conocimiento, And) else And(conocimiento)
+
+
+def obtener(n):
+    """Plantilla de tamaño n, construida la primera vez que se pide"""
+    plantilla = _plantillas.get(n)
+    if plantilla is None:
+        with _lock:
+            plantilla = _plantillas.get(n)
+            if plantilla is None:
+                plantilla = _plantillas[n] = Plantilla(n)
+    return plantilla
+
+
+def precalentar(tamanos, maximo):
+    """Construye por adelantado las plantillas de los tamaños indicados.
+
+    Cada plantilla enumera n! universos, así que un tamaño mayor que `maximo`
+    se rechaza antes de construir ninguna.
+    """
+    tamanos = list(tamanos)
+    for n in tamanos:
+        if not 1 <= n <= maximo:
+            raise ValueError(f"No se precalienta la plantilla de {n} colores (de 1 a {maximo})")
+    for n in tamanos:
+        obtener(n)
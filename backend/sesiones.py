@@ -0,0 +1,258 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class SesionNoEncontrada(KeyError):
+    """El id no corresponde a ninguna partida activa (nunca creada, expirada o desalojada)"""
+
+
+def _sin_medida(juego):
+    return 0
+
+
+class Sesion:
+    def __init__(self, juego, bytes_=0):
+        self.juego = juego
+        self.lock = threading.Lock()
+        self.ultimo_acceso = time.monotonic()
+        self.bytes = bytes_  # Memoria de la partida medida tras su último uso
+
+
+class GestorSesiones:
+    """Partidas activas por id, con un lock por partida, límites LRU y caducidad por inactividad.
+
+    Además del número de partidas se limita la memoria: `medir` estima los
+    bytes de una partida tras cada uso y, si el total pasa de `max_bytes`,
+    se desalojan las de acceso más antiguo.
+    """
+
+    def __init__(self, fabrica, max_sesiones=10000, ttl=3600, max_bytes=None, medir=_sin_medida):
+        self.fabrica = fabrica  # Crea el estado de una partida nueva
+        self.max_sesiones = max_sesiones
+        self.ttl = ttl  # Segundos de inactividad antes de expirar
+        self.max_bytes = max_bytes  # None: sin límite de memoria
+        self.medir = medir  # juego -> bytes que ocupa
+        self.bytes = 0  # Suma de Sesion.bytes de las partidas activas
+        self._sesiones = OrderedDict()  # Del acceso más antiguo al más reciente
+        self._lock = threading.Lock()  # Solo protege el diccionario, nunca una partida
+
+    def crear(self, fabrica=None):
+        """Registra una partida nueva y devuelve su id; `fabrica` sustituye a la por defecto"""
+        id_juego = uuid.uuid4().hex
+        juego = (fabrica or self.fabrica)()
+        sesion = Sesion(juego, self.medir(juego))
+        with self._lock:
+            self._expirar(sesion.ultimo_acceso)
+            self._sesiones[id_juego] = sesion
+            self.bytes += sesion.bytes
+            self._desalojar()
+        return id_juego
+
+    @contextmanager
+    def usar(self, id_juego, solo_lectura=False):
+        """Bloquea la partida mientras dura el bloque; `solo_lectura` no cambia nada aquí"""
+        ahora = time.monotonic()
+        with self._lock:
+            self._expirar(ahora)
+            sesion = self._sesiones.get(id_juego)
+            if sesion is None:
+                raise SesionNoEncontrada(id_juego)
+            sesion.ultimo_acceso = ahora
+            self._sesiones.move_to_end(id_juego)
+        with sesion.lock:
+            try:
+                yield sesion.juego
+            finally:
+                bytes_ = self.medir(sesion.juego)
+                with self._lock:
+                    # Otra petición pudo desalojarla mientras tanto
+                    if self._sesiones.get(id_juego) is sesion:
+                        self.bytes += bytes_ - sesion.bytes
+                        sesion.bytes = bytes_
+                        self._desalojar()
+
+    def eliminar(self, id_juego):
+        with self._lock:
+            sesion = self._sesiones.pop(id_juego, None)
+            if sesion is not None:
+                self.bytes -= sesion.bytes
+
+    def __len__(self):
+        return len(self._sesiones)
+
+    def _expirar(self, ahora):
+        # El orden por último acceso permite parar en la primera sesión viva
+        limite = ahora - self.ttl
+        while self._sesiones:
+            sesion = next(iter(self._sesiones.values()))
+            if sesion.ultimo_acceso > limite:
+                break
+            self._quitar_primera()
+
+    def _desalojar(self):
+        # La partida más reciente se conserva aunque sola supere el límite
+        while len(self._sesiones) > self.max_sesiones or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+                and len(self._sesiones) > 1):
+            self._quitar_primera()
+
+    def _quitar_primera(self):
+        _, sesion = self._sesiones.popitem(last=False)
+        self.bytes -= sesion.bytes
+
+
+class ConflictoSesion(Exception):
+    """Otro proceso guardó la partida mientras esta petición la usaba"""
+
+
+class GestorPersistente:
+    """Partidas guardadas en SQLite para que cualquier proceso pueda continuarlas.
+
+    Cada partida es una fila (id, versión, último acceso, datos) con el
+    formato compacto de persistencia.py. Una caché en memoria conserva el
+    objeto de la última versión que vio este proceso: si la fila no ha
+    cambiado desde entonces no se vuelve a deserializar. Las escrituras son
+    optimistas: si otro proceso guardó antes, la petición falla con
+    ConflictoSesion en lugar de pisar su estado. Dentro del proceso, un lock
+    por partida (repartidos en franjas) serializa sus peticiones como en
+    GestorSesiones. La caché se limita en entradas y, con `medir`, en bytes.
+    """
+
+    def __init__(self, fabrica, ruta, serializar, restaurar, max_sesiones=10000, ttl=3600,
+                 tam_cache=1000, franjas=64, max_bytes=None, medir=_sin_medida):
+        self.fabrica = fabrica
+        self.ruta = ruta
+        self.serializar = serializar  # juego -> bytes
+        self.restaurar = restaurar  # bytes -> juego
+        self.max_sesiones = max_sesiones
+        self.ttl = ttl
+        self.tam_cache = tam_cache
+        self.max_bytes = max_bytes  # Límite de la caché en memoria; la base no lo tiene
+        self.medir = medir
+        self.bytes = 0  # Bytes de las partidas en caché
+        # id -> (versión, juego, bytes), del uso más antiguo al más reciente
+        self._cache = OrderedDict()
+        self._lock_cache = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(franjas)]
+        self._local = threading.local()  # Una conexión por hilo
+        with self._conexion() as conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS sesiones (id TEXT PRIMARY KEY, version INTEGER NOT NULL,"
+                " ultimo_acceso REAL NOT NULL, datos BLOB NOT NULL)")
+            conexion.execute(
+                "CREATE INDEX IF NOT EXISTS sesiones_acceso ON sesiones (ultimo_acceso)")
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def crear(self, fabrica=None):
+        """Registra una partida nueva y devuelve su id; `fabrica` sustituye a la por defecto"""
+        id_juego = uuid.uuid4().hex
+        juego = (fabrica or self.fabrica)()
+        ahora = time.time()
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM sesiones WHERE ultimo_acceso <= ?", (ahora - self.ttl,))
+            conexion.execute("INSERT INTO sesiones VALUES (?, 0, ?, ?)",
+                             (id_juego, ahora, self.serializar(juego)))
+            conexion.execute(
+                "DELETE FROM sesiones WHERE id IN (SELECT id FROM sesiones"
+                " ORDER BY ultimo_acceso DESC LIMIT -1 OFFSET ?)", (self.max_sesiones,))
+        self._guardar_en_cache(id_juego, 0, juego)
+        return id_juego
+
+    @contextmanager
+    def usar(self, id_juego, solo_lectura=False):
+        """Carga la partida, la bloquea en este proceso y la guarda al salir del bloque.
+
+        Con `solo_lectura` el bloque promete no modificarla: solo se renueva
+        el último acceso, sin serializar ni cambiar la versión.
+        """
+        if id_juego is None:
+            raise SesionNoEncontrada(id_juego)
+        with self._locks[hash(id_juego) % len(self._locks)]:
+            conexion = self._conexion()
+            ahora = time.time()
+            fila = conexion.execute(
+                "SELECT version, ultimo_acceso FROM sesiones WHERE id = ?", (id_juego,)).fetchone()
+            if fila is None or fila[1] <= ahora - self.ttl:
+                self.eliminar(id_juego)
+                raise SesionNoEncontrada(id_juego)
+            version = fila[0]
+            juego = self._leer_cache(id_juego, version)
+            if juego is None:
+                (datos,) = conexion.execute(
+                    "SELECT datos FROM sesiones WHERE id = ?", (id_juego,)).fetchone()
+                juego = self.restaurar(datos)
+
+            try:
+                yield juego
+            except BaseException:
+                # El objeto puede haber quedado a medias: la próxima vez se relee
+                self._olvidar(id_juego)
+                raise
+
+            if solo_lectura:
+                with conexion:
+                    conexion.execute("UPDATE sesiones SET ultimo_acceso = ? WHERE id = ?",
+                                     (ahora, id_juego))
+                self._guardar_en_cache(id_juego, version, juego)
+                return
+
+            with conexion:
+                cursor = conexion.execute(
+                    "UPDATE sesiones SET version = ?, ultimo_acceso = ?, datos = ?"
+                    " WHERE id = ? AND version = ?",
+                    (version + 1, ahora, self.serializar(juego), id_juego, version))
+            if cursor.rowcount == 0:
+                self._olvidar(id_juego)
+                raise ConflictoSesion(id_juego)
+            self._guardar_en_cache(id_juego, version + 1, juego)
+
+    def eliminar(self, id_juego):
+        self._olvidar(id_juego)
+        with self._conexion() as conexion:
+            conexion.execute("DELETE FROM sesiones WHERE id = ?", (id_juego,))
+
+    def __len__(self):
+        (total,) = self._conexion().execute(
+            "SELECT COUNT(*) FROM sesiones WHERE ultimo_acceso > ?",
+            (time.time() - self.ttl,)).fetchone()
+        return total
+
+    def _leer_cache(self, id_juego, version):
+        with self._lock_cache:
+            entrada = self._cache.get(id_juego)
+            if entrada is None or entrada[0] != version:
+                return None
+            self._cache.move_to_end(id_juego)
+            return entrada[1]
+
+    def _guardar_en_cache(self, id_juego, version, juego):
+        bytes_ = self.medir(juego)
+        with self._lock_cache:
+            self._quitar_de_cache(id_juego)
+            self._cache[id_juego] = (version, juego, bytes_)
+            self.bytes += bytes_
+            while len(self._cache) > self.tam_cache or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes
+                    and len(self._cache) > 1):
+                self._quitar_de_cache(next(iter(self._cache)))
+
+    def _olvidar(self, id_juego):
+        with self._lock_cache:
+            self._quitar_de_cache(id_juego)
+
+    def _quitar_de_cache(self, id_juego):
+        entrada = self._cache.pop(id_juego, None)
+        if entrada is not None:
+            self.bytes -= entrada[2]
@@ -0,0 +1,142 @@
+"""Simulación por lotes: partidas automáticas contra todos los secretos o una muestra.
+
+Uso: python simulacion.py 6 [--estrategia minimax] [--muestra 500] [--procesos 4]
+"""
+import argparse
+import json
+import multiprocessing
+import random
+from math import factorial
+
+import numpy as np
+
+import universos
+from juegos import JuegoMastermind
+
+TAM_TROZO = 16  # Secretos por tarea enviada a cada proceso
+
+
+def _jugar_trozo(tarea):
+    """Juega una partida por secreto del trozo; devuelve [(rango, intentos), ...]"""
+    n, estrategia, rangos, semilla = tarea
+    random.seed(semilla)
+    np.random.seed(semilla % 2 ** 32)
+    resultados = []
+    for rango in rangos:
+        secreto = universos.decodificar([rango], n)[0].tolist()
+        juego = JuegoMastermind()
+        juego.especular = False
+        juego.configurar_juego(n, estrategia)
+        if hasattr(juego.estrategia, "procesos"):
+            juego.estrategia.procesos = 0  # Cada proceso ya es un trabajador del lote
+        while True:
+            propuesta = juego.generar_propuesta()
+            if propuesta is None:
+                raise RuntimeError(f"Sin universos válidos para el secreto {secreto}")
+            fila = juego._codificar(propuesta).tolist()
+            aciertos = sum(a == b for a, b in zip(fila, secreto))
+            if juego.procesar_respuesta(propuesta, aciertos)["status"] == "ganado":
+                break
+        resultados.append((int(rango), juego.intentos + 1))
+    return resultados
+
+
+class Estadisticas:
+    """Agregado incremental de intentos por partida"""
+
+    def __init__(self, n, total):
+        self.n = n
+        self.total = total
+        self.distribucion = {}
+        self.suma = 0
+        self.completadas = 0
+        self.peores = []  # (intentos, rango) de las partidas más largas
+
+    def agregar(self, resultados):
+        for rango, intentos in resultados:
+            self.distribucion[intentos] = self.distribucion.get(intentos, 0) + 1
+            self.suma += intentos
+            self.completadas += 1
+            self.peores.append((intentos, rango))
+        self.peores = sorted(self.peores, reverse=True)[:5]
+
+    def resumen(self):
+        return {
+            "num_elementos": self.n,
+            "completadas": self.completadas,
+            "total": self.total,
+            "media": self.suma / self.completadas if self.completadas else None,
+            "max": max(self.distribucion) if self.distribucion else None,
+            "min": min(self.distribucion) if self.distribucion else None,
+            "distribucion": {str(k): v for k, v in sorted(self.distribucion.items())},
+            "peores": [
+                {"intentos": intentos,
+                 "secreto": [f"p{i}c{c}" for i, c in
+                             enumerate(universos.decodificar([rango], self.n)[0].tolist())]}
+                for intentos, rango in self.peores
+            ],
+        }
+
+
+def num_partidas(n, muestra=None):
+    """Partidas que jugará simular(), sin generar los secretos"""
+    total = factorial(n)
+    return total if muestra is None else min(total, muestra)
+
+
+def secretos(n, muestra=None, semilla=0):
+    """Rangos de todos los secretos, o de una muestra aleatoria sin repetición"""
+    total = factorial(n)
+    if muestra is None or muestra >= total:
+        return list(range(total))
+    return sorted(random.Random(semilla).sample(range(total), muestra))
+
+
+def _contexto():
+    """Contexto de multiprocessing para los trabajadores del lote.
+
+    /simular lanza el lote desde un servidor con hilos, donde un fork copiaría
+    cerrojos tomados por otros hilos: los trabajadores salen de forkserver (o
+    spawn) e importan juegos, no app.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("forkserver")
+        contexto.set_forkserver_preload(["juegos"])
+        return contexto
+    return multiprocessing.get_context("spawn")
+
+
+def simular(n, estrategia=None, muestra=None, procesos=None, tam_trozo=TAM_TROZO, semilla=0):
+    """Genera el resumen acumulado cada vez que termina un trozo de partidas"""
+    rangos = secretos(n, muestra, semilla)
+    tareas = [(n, estrategia, rangos[i:i + tam_trozo], semilla * 1000003 + i)
+              for i in range(0, len(rangos), tam_trozo)]
+    estadisticas = Estadisticas(n, len(rangos))
+    with _contexto().Pool(procesos) as pool:
+        for resultados in pool.imap_unordered(_jugar_trozo, tareas):
+            estadisticas.agregar(resultados)
+            yield estadisticas.resumen()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula partidas por lotes")
+    parser.add_argument("n", type=int, help="número de colores y posiciones")
+    parser.add_argument("--estrategia", default=None)
+    parser.add_argument("--muestra", type=int, default=None,
+                        help="secretos aleatorios a jugar (por defecto, todos)")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--trozo", type=int, default=TAM_TROZO)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    resumen = None
+    for resumen in simular(args.n, args.estrategia, args.muestra, args.procesos,
+                           args.trozo, args.semilla):
+        print(f"\r{resumen['completadas']}/{resumen['total']} partidas, "
+              f"media {resumen['media']:.3f}, max {resumen['max']}", end="", flush=True)
+    print()
+    print(json.dumps(resumen, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
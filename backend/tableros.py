@@ -0,0 +1,178 @@
+"""Tableros generalizados: c colores, p posiciones, repetición y fichas negras/blancas.
+
+Cada código es el entero que forman sus colores en base c (la posición 0 es
+la cifra más significativa). La respuesta a una propuesta se guarda como una
+clave uint8 negras * (p + 1) + blancas, y las respuestas de cada código frente
+a todos los demás se calculan la primera vez que se piden y quedan en caché:
+la tabla completa código × código si cabe en memoria, o fila a fila si no.
+"""
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+MAX_TABLA = 1 << 24  # Celdas de la tabla completa; por encima se guardan filas sueltas
+# Bytes de filas de respuestas que se conservan entre todos los tableros grandes;
+# cada fila ocupa total(c, p) bytes, 1 MiB en un tablero de 4 colores y 10 posiciones
+BYTES_FILAS_EN_CACHE = 256 << 20
+# Colores y claves de respuesta se guardan como uint8: hasta 255 colores y,
+# con 15 posiciones, la clave mayor es (p + 1) ** 2 - 1 = 255
+MAX_COLORES = 255
+MAX_POSICIONES = 15
+MAX_HISTOGRAMAS = 1 << 26  # Bytes de _histogramas (c ** p × c) que se admiten
+
+
+def total(colores, posiciones):
+    return colores ** posiciones
+
+
+def admitido(colores, posiciones):
+    """Si las tablas uint8 y los histogramas del tablero caben en los límites"""
+    return (colores <= MAX_COLORES and posiciones <= MAX_POSICIONES
+            and total(colores, posiciones) * colores <= MAX_HISTOGRAMAS)
+
+
+def tipo_codigo(colores, posiciones):
+    return np.uint32 if total(colores, posiciones) <= np.iinfo(np.uint32).max else np.uint64
+
+
+def todos_los_codigos(colores, posiciones, repeticion=True):
+    """Espacio de universos; sin repetición, solo los códigos de colores distintos"""
+    codigos = np.arange(total(colores, posiciones), dtype=tipo_codigo(colores, posiciones))
+    if repeticion:
+        return codigos
+    return codigos[_histogramas(colores, posiciones).max(axis=1) <= 1]
+
+
+def codigo(fila, colores):
+    resultado = 0
+    for color in fila:
+        resultado = resultado * colores + int(color)
+    return resultado
+
+
+def decodificar(codigos, colores, posiciones):
+    """Convierte códigos en filas (len(codigos), p) de colores por posición"""
+    return _filas(colores, posiciones)[np.asarray(codigos, dtype=np.intp).reshape(-1)]
+
+
+def clave(negras, blancas, posiciones):
+    return negras * (posiciones + 1) + blancas
+
+
+def num_claves(posiciones):
+    return (posiciones + 1) ** 2
+
+
+def tabla_completa(colores, posiciones):
+    """Si las respuestas se guardan en una tabla completa o se calculan por filas"""
+    return total(colores, posiciones) ** 2 <= MAX_TABLA
+
+
+def respuestas(codigo, colores, posiciones):
+    """Clave de la respuesta de `codigo` frente a cada código del tablero"""
+    if tabla_completa(colores, posiciones):
+        return tabla(colores, posiciones)[codigo]
+    return _fila(colores, posiciones, int(codigo))
+
+
+def filtrar(codigos, colores, posiciones, propuesta, respuesta):
+    """Códigos que habrían dado exactamente `respuesta` a `propuesta`"""
+    return codigos[respuestas(propuesta, colores, posiciones)[codigos] == respuesta]
+
+
+def particiones(propuestas, candidatos, colores, posiciones):
+    """Para cada propuesta, cuántos candidatos darían cada clave de respuesta"""
+    tabla = np.empty((len(propuestas), num_claves(posiciones)), dtype=np.int64)
+    for k, propuesta in enumerate(propuestas):
+        tabla[k] = np.bincount(respuestas(propuesta, colores, posiciones)[candidatos],
+                               minlength=num_claves(posiciones))
+    return tabla
+
+
+def representantes(colores, posiciones):
+    """Un código por cada reparto de repeticiones, en orden creciente de colores.
+
+    Antes de la primera respuesta dos propuestas con el mismo reparto (1122 y
+    3344, por ejemplo) son equivalentes por simetría de colores y posiciones.
+    """
+    resultado = []
+
+    def repartir(restantes, maximo, partes):
+        if restantes == 0:
+            fila = [color for color, veces in enumerate(partes) for _ in range(veces)]
+            resultado.append(codigo(fila, colores))
+            return
+        if len(partes) == colores:
+            return
+        for veces in range(min(restantes, maximo), 0, -1):
+            repartir(restantes - veces, veces, partes + [veces])
+
+    repartir(posiciones, posiciones, [])
+    return np.array(sorted(resultado), dtype=tipo_codigo(colores, posiciones))
+
+
+@lru_cache(maxsize=None)
+def tabla(colores, posiciones):
+    """Tabla uint8 código × código de claves de respuesta"""
+    n = total(colores, posiciones)
+    resultado = np.empty((n, n), dtype=np.uint8)
+    for k in range(n):
+        resultado[k] = _calcular_fila(colores, posiciones, k)
+    resultado.flags.writeable = False
+    return resultado
+
+
+_filas_en_cache = OrderedDict()  # (colores, posiciones, codigo) -> fila, de la menos reciente
+_bytes_filas = 0
+_lock_filas = threading.Lock()
+
+
+def _fila(colores, posiciones, codigo):
+    global _bytes_filas
+    clave = (colores, posiciones, codigo)
+    with _lock_filas:
+        fila = _filas_en_cache.get(clave)
+        if fila is not None:
+            _filas_en_cache.move_to_end(clave)
+            return fila
+    fila = _calcular_fila(colores, posiciones, codigo)
+    fila.flags.writeable = False
+    with _lock_filas:
+        if clave not in _filas_en_cache:
+            _filas_en_cache[clave] = fila
+            _bytes_filas += fila.nbytes
+        while _bytes_filas > BYTES_FILAS_EN_CACHE and len(_filas_en_cache) > 1:
+            _, vieja = _filas_en_cache.popitem(last=False)
+            _bytes_filas -= vieja.nbytes
+    return fila
+
+
+def _calcular_fila(colores, posiciones, codigo):
+    filas = _filas(colores, posiciones)
+    histogramas = _histogramas(colores, posiciones)
+    negras = (filas == filas[codigo]).sum(axis=1)
+    # Colores en común sin mirar la posición; las negras también cuentan ahí
+    comunes = np.minimum(histogramas, histogramas[codigo]).sum(axis=1)
+    return (negras * (posiciones + 1) + comunes - negras).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _filas(colores, posiciones):
+    codigos = np.arange(total(colores, posiciones))
+    pesos = colores ** np.arange(posiciones - 1, -1, -1)
+    filas = (codigos[:, None] // pesos % colores).astype(np.uint8)
+    filas.flags.writeable = False
+    return filas
+
+
+@lru_cache(maxsize=None)
+def _histogramas(colores, posiciones):
+    """Veces que aparece cada color en cada código, forma (c ** p, c)"""
+    filas = _filas(colores, posiciones)
+    histogramas = np.zeros((len(filas), colores), dtype=np.uint8)
+    for color in range(colores):
+        histogramas[:, color] = (filas == color).sum(axis=1)
+    histogramas.flags.writeable = False
+    return histogramas
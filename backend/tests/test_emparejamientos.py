@@ -0,0 +1,54 @@
+"""contar, enumerar y buscar frente a recorrer todas las permutaciones."""
+import random
+from itertools import permutations
+
+import pytest
+
+import emparejamientos
+
+
+def instancia(rng):
+    """(posibles, restricciones, n) pequeños; a veces sin ningún universo"""
+    n = rng.randint(1, 6)
+    secreto = rng.sample(range(n), n)
+    posibles = [(1 << n) - 1] * n
+    for i in range(n):
+        if rng.random() < 0.2:
+            posibles[i] &= ~(1 << rng.randrange(n))
+    restricciones = []
+    for _ in range(rng.randint(0, 4)):
+        fila = tuple(rng.sample(range(n), n))
+        if rng.random() < 0.8:
+            aciertos = sum(a == b for a, b in zip(fila, secreto))
+        else:
+            aciertos = rng.randint(0, n)
+        restricciones.append((fila, aciertos))
+    return posibles, restricciones, n
+
+
+def consistentes(posibles, restricciones, n):
+    return {
+        permutacion for permutacion in permutations(range(n))
+        if all(posibles[i] >> color & 1 for i, color in enumerate(permutacion))
+        and all(sum(a == b for a, b in zip(fila, permutacion)) == aciertos
+                for fila, aciertos in restricciones)
+    }
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_coincide_con_permutaciones(semilla):
+    rng = random.Random(semilla)
+    posibles, restricciones, n = instancia(rng)
+    esperados = consistentes(posibles, restricciones, n)
+
+    assert emparejamientos.contar(posibles, restricciones, n, limite=10 ** 6) == len(esperados)
+
+    enumerados = [tuple(fila) for fila in emparejamientos.enumerar(posibles, restricciones, n)]
+    assert len(enumerados) == len(set(enumerados))
+    assert set(enumerados) == esperados
+
+    encontrado = emparejamientos.buscar(posibles, restricciones, n, rng)
+    if esperados:
+        assert tuple(encontrado) in esperados
+    else:
+        assert encontrado is None
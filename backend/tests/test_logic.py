@@ -0,0 +1,66 @@
+"""model_check against truth-table enumeration on small random formulas."""
+import itertools
+import random
+
+import pytest
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol, model_check
+
+SYMBOLS = [Symbol(name) for name in "abcd"]
+
+
+def random_sentence(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(SYMBOLS)
+    kind = rng.choice(["not", "and", "or", "implication", "biconditional"])
+    if kind == "not":
+        return Not(random_sentence(rng, depth - 1))
+    if kind == "implication":
+        return Implication(random_sentence(rng, depth - 1), random_sentence(rng, depth - 1))
+    if kind == "biconditional":
+        return Biconditional(random_sentence(rng, depth - 1), random_sentence(rng, depth - 1))
+    operands = [random_sentence(rng, depth - 1) for _ in range(rng.randint(1, 3))]
+    return And(*operands) if kind == "and" else Or(*operands)
+
+
+def entails(knowledge, query):
+    """Truth-table definition: query holds in every model of knowledge."""
+    for values in itertools.product([False, True], repeat=len(SYMBOLS)):
+        model = {symbol.name: value for symbol, value in zip(SYMBOLS, values)}
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_model_check_matches_truth_table(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        knowledge = And(*[random_sentence(rng, 3) for _ in range(rng.randint(1, 4))])
+        query = random_sentence(rng, 3)
+        assert model_check(knowledge, query) == entails(knowledge, query), (knowledge, query)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_model_check_follows_add_and_truncate(seed):
+    # The same knowledge base is queried as it grows and shrinks, so the
+    # cached encoding has to follow every change
+    rng = random.Random(seed)
+    knowledge = And()
+    for _ in range(12):
+        if knowledge.conjuncts and rng.random() < 0.25:
+            knowledge.truncate(rng.randrange(len(knowledge.conjuncts)))
+        else:
+            knowledge.add(random_sentence(rng, 2))
+        query = random_sentence(rng, 2)
+        assert model_check(knowledge, query) == entails(knowledge, query), (knowledge, query)
+
+
+def test_adding_to_a_nested_conjunction_keeps_the_parent():
+    a, b, c = SYMBOLS[:3]
+    conjunction = And(a, b)
+    negation = Not(conjunction)
+    conjunction.add(c)
+    assert negation == Not(And(a, b))
+    assert hash(negation) == hash(Not(And(a, b)))
+    assert model_check(And(negation, a), Not(b))
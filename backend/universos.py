@@ -0,0 +1,84 @@
+from functools import lru_cache
+from itertools import permutations
+from math import factorial
+
+import numpy as np
+
+TAM_BLOQUE = 1 << 16  # Filas decodificadas a la vez al recorrer el espacio
+LARGO_SUFIJO = 7  # Las últimas posiciones se decodifican con una tabla de 7! filas
+
+
+def tipo_rango(n):
+    """Entero sin signo más pequeño que representa todos los rangos de n!"""
+    return np.uint32 if factorial(n) <= np.iinfo(np.uint32).max else np.uint64
+
+
+def todos_los_rangos(n):
+    """Espacio completo de universos: los rangos 0..n!-1 en orden lexicográfico"""
+    return np.arange(factorial(n), dtype=tipo_rango(n))
+
+
+def rango(fila):
+    """Código de Lehmer de una permutación: su posición en orden lexicográfico"""
+    n = len(fila)
+    disponibles = list(range(n))
+    resultado = 0
+    for i, color in enumerate(fila):
+        k = disponibles.index(int(color))
+        resultado += k * factorial(n - 1 - i)
+        disponibles.pop(k)
+    return resultado
+
+
+def decodificar(rangos, n):
+    """Convierte rangos en filas (len(rangos), n) de colores por posición"""
+    m = min(n, LARGO_SUFIJO)
+    alto, bajo = np.divmod(np.asarray(rangos, dtype=np.int64).reshape(-1), factorial(m))
+
+    # Rangos con el mismo cociente comparten las primeras n - m posiciones:
+    # cada prefijo se decodifica una vez y el sufijo sale de una tabla fija
+    prefijos, grupo = np.unique(alto, return_inverse=True)
+    cabezas, restantes = _decodificar_prefijos(prefijos, n, m)
+    filas = np.empty((len(alto), n), dtype=np.uint8)
+    filas[:, :n - m] = cabezas[grupo]
+    filas[:, n - m:] = np.take_along_axis(restantes[grupo], _sufijos(m)[bajo], axis=1)
+    return filas
+
+
+def _decodificar_prefijos(prefijos, n, m):
+    """Primeras n - m posiciones de cada prefijo y sus m colores sin usar, en orden"""
+    cabezas = np.empty((len(prefijos), n - m), dtype=np.uint8)
+    disponibles = np.ones((len(prefijos), n), dtype=bool)
+    indices = np.arange(len(prefijos))
+    resto = prefijos
+    for i in range(n - m):
+        digito, resto = np.divmod(resto, factorial(n - 1 - i) // factorial(m))
+        # El color es el (digito)-ésimo que sigue disponible en cada fila
+        acumulado = np.cumsum(disponibles, axis=1)
+        color = np.argmax(acumulado > digito[:, None], axis=1)
+        cabezas[:, i] = color
+        disponibles[indices, color] = False
+    restantes = np.nonzero(disponibles)[1].reshape(len(prefijos), m).astype(np.uint8)
+    return cabezas, restantes
+
+
+@lru_cache(maxsize=None)
+def _sufijos(m):
+    """Todas las permutaciones de range(m) en orden lexicográfico"""
+    return np.array(list(permutations(range(m))), dtype=np.intp).reshape(-1, m)
+
+
+def bloques(rangos, n, tam=TAM_BLOQUE):
+    """Recorre los rangos por bloques, generando (rangos, filas) bajo demanda"""
+    for inicio in range(0, len(rangos), tam):
+        parte = rangos[inicio:inicio + tam]
+        yield parte, decodificar(parte, n)
+
+
+def filtrar(rangos, n, fila, aciertos):
+    """Rangos cuyas filas coinciden con `fila` en exactamente `aciertos` posiciones"""
+    conservados = [parte[(filas == fila).sum(axis=1) == aciertos]
+                   for parte, filas in bloques(rangos, n)]
+    if not conservados:
+        return rangos[:0]
+    return np.concatenate(conservados)
@@ -10,6 +10,7 @@ export default function Game() {
   const [selectedHits, setSelectedHits] = useState(0)
   const [colors, setColors] = useState(4)
   const [gameWon, setGameWon] = useState(false)
+  const [gameId, setGameId] = useState(null)
 
   useEffect(() => {
     const queryParams = new URLSearchParams(window.location.search)
@@ -17,12 +18,15 @@ export default function Game() {
     setColors(numColors)
 
     axios.post('http://localhost:5000/iniciar', { num_elementos: numColors })
-      .then(() => fetchProposal())
+      .then(res => {
+        setGameId(res.data.id_juego)
+        fetchProposal(res.data.id_juego)
+      })
       .catch(err => console.error("Error al iniciar el juego:", err))
   }, [])
 
-  const fetchProposal = () => {
-    axios.get('http://localhost:5000/propuesta')
+  const fetchProposal = (id = gameId) => {
+    axios.get('http://localhost:5000/propuesta', { params: { id_juego: id } })
       .then(res => {
         if (!gameWon) {
           setProposal(res.data.propuesta)
@@ -35,8 +39,10 @@ export default function Game() {
     if (gameWon) return
 
     axios.post('http://localhost:5000/responder', {
+      id_juego: gameId,
       propuesta: proposal,
-      aciertos: selectedHits
+      aciertos: selectedHits,
+      desde: history.length  // Solo interesa lo nuevo del historial
     }).then(res => {
       console.log("Respuesta del servidor:", res.data) // Para debugging
       